@@ -0,0 +1,69 @@
+# Import standard library modules
+import importlib.util
+import logging
+import os
+
+# Import the ASGI server
+import uvicorn
+
+# Import local modules
+from .config import settings
+from .database import background_pool_size, max_workers
+
+logger = logging.getLogger(__name__)
+
+
+def worker_count():
+    """
+    Number of server worker processes: web_concurrency, or one per CPU,
+    clamped to the number the connection budget can serve.
+
+    Raises:
+        ValueError: If the budget cannot serve even one worker.
+    """
+    requested = settings.web_concurrency or os.cpu_count() or 1
+    limit = max_workers(settings.db_connection_budget, background_pool_size())
+    if limit < 1:
+        raise ValueError(f"db_connection_budget {settings.db_connection_budget} is too small for one worker, "
+                         f"which needs {background_pool_size() + 2} connections")
+    if requested > limit:
+        logger.warning("running %d workers instead of %d to stay within db_connection_budget %d",
+                       limit, requested, settings.db_connection_budget)
+    return min(requested, limit)
+
+
+def server_options():
+    """
+    Build the uvicorn options used by `python -m app` from the settings.
+
+    uvloop and httptools are used when installed; otherwise uvicorn falls
+    back to asyncio and h11.
+
+    Returns:
+        dict: Keyword arguments for uvicorn.run.
+    """
+    return {
+        "host": settings.web_host,
+        "port": settings.web_port,
+        "workers": worker_count(),
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+        "timeout_keep_alive": settings.web_keep_alive_seconds,
+        "backlog": settings.web_backlog,
+        # On SIGTERM stop accepting, let in-flight requests finish, then run the lifespan shutdown
+        "timeout_graceful_shutdown": settings.web_graceful_timeout_seconds,
+    }
+
+
+def main():
+    """
+    Run the API with one worker process per CPU (or web_concurrency).
+    """
+    options = server_options()
+    # Worker processes size their connection pools from the same worker count
+    os.environ["WEB_CONCURRENCY"] = str(options["workers"])
+    uvicorn.run("app.main:app", **options)
+
+
+if __name__ == "__main__":
+    main()
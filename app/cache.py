@@ -0,0 +1,189 @@
+# Import standard library modules for locking, timing and background work
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Import local modules
+from .config import settings
+from .database import BackgroundSessionLocal
+from .metrics import metrics
+from .singleflight import SingleFlight
+from . import invalidation
+
+
+class _Entry:
+    """
+    A cached value together with the time and cache generation it was stored at.
+    """
+    __slots__ = ("value", "stored_at", "generation")
+
+    def __init__(self, value, stored_at, generation):
+        self.value = value
+        self.stored_at = stored_at
+        self.generation = generation
+
+
+class ResponseCache:
+    """
+    In-process response cache with stale-while-revalidate and single-flight loads.
+
+    Entries are fresh for `ttl` seconds. For a further `stale_ttl` seconds they
+    are still served while one background refresh replaces them. Concurrent
+    misses for the same key share a single load. Invalidation bumps a
+    generation counter instead of dropping entries, so the last known value can
+    still be served if the database is unavailable.
+
+    Attributes:
+        name (str): Prefix of the hit, stale and miss counters in the metrics registry
+        ttl (float): Seconds an entry is served without refreshing it
+        stale_ttl (float): Seconds past ttl an entry is served while refreshing
+        max_entries (int): Maximum number of keys kept, least recently used evicted
+        session_factory (callable): Creates the session used by background refreshes
+    """
+
+    def __init__(self, name, ttl, stale_ttl, max_entries, session_factory):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.session_factory = session_factory
+        self._entries = OrderedDict()
+        self._flight = SingleFlight(f"{name}.load")
+        self._refreshing = set()
+        self._generation = 0
+        self._lock = threading.Lock()
+        # Two threads, as reserved in the background pool by database.background_pool_size
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+
+    def get(self, key, loader, db):
+        """
+        Return the cached value for a key, loading it when missing or invalidated.
+
+        Args:
+            key (hashable): The cache key, typically the request parameters
+            loader (callable): Takes a session and returns the value to cache
+            db (Session): The request's session, used for foreground loads
+
+        Returns:
+            The cached or freshly loaded value.
+
+        Raises:
+            Exception: Whatever the loader raised, if there is no stale value to fall back to.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.generation == self._generation:
+                age = now - entry.stored_at
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    metrics.inc(f"{self.name}.hit")
+                    return entry.value
+                if age < self.ttl + self.stale_ttl:
+                    # Serve the stale value and refresh it once in the background
+                    self._entries.move_to_end(key)
+                    metrics.inc(f"{self.name}.stale")
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        self._executor.submit(self._refresh, key, loader)
+                    return entry.value
+
+            metrics.inc(f"{self.name}.miss")
+
+        try:
+            return self._flight.do(key, lambda: self._load(key, loader, db))
+        except Exception:
+            # Keep serving the last known value while the database is unavailable
+            if entry is not None:
+                return entry.value
+            raise
+
+    def warm(self, key, loader):
+        """
+        Reload the value for a key in the background, unless a reload is already running.
+
+        Args:
+            key (hashable): The cache key
+            loader (callable): Takes a session and returns the value to cache
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        self._executor.submit(self._refresh, key, loader)
+
+    def invalidate(self, id=None):
+        """
+        Mark every cached value as outdated.
+
+        Outdated values are reloaded on the next request but are kept as a
+        fallback in case that reload fails. The signature matches invalidation
+        handlers; the ID is ignored because any change can move any page.
+
+        Args:
+            id (int): The ID of the changed entity, unused.
+        """
+        with self._lock:
+            self._generation += 1
+
+    def clear(self):
+        """
+        Drop every cached value.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def _load(self, key, loader, db):
+        # Load the value on behalf of every caller coalesced into this flight
+        with self._lock:
+            generation = self._generation
+        try:
+            value = loader(db)
+        except Exception:
+            metrics.inc(f"{self.name}.load_error")
+            raise
+        self._store(key, value, generation)
+        return value
+
+    def _refresh(self, key, loader):
+        # Background refreshes run outside any request, so they open their own session
+        with self._lock:
+            generation = self._generation
+        db = self.session_factory()
+        try:
+            self._store(key, loader(db), generation)
+        except Exception:
+            # Keep the stale entry; the next request past stale_ttl retries in the foreground
+            pass
+        finally:
+            db.close()
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key, value, generation):
+        # A value loaded before an invalidation is stored with its old generation,
+        # which keeps it as a fallback without ever serving it as fresh
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None and current.generation > generation:
+                return
+            self._entries[key] = _Entry(value, time.monotonic(), generation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+# Cache for GET /posts pages, keyed by (limit, skip, search)
+feed_cache = ResponseCache(
+    name="feed_cache",
+    ttl=settings.feed_cache_ttl_seconds,
+    stale_ttl=settings.feed_cache_stale_seconds,
+    max_entries=settings.feed_cache_max_entries,
+    session_factory=BackgroundSessionLocal,
+)
+
+# Any post or vote change, from this worker or another, can change any feed page
+invalidation.subscribe("post", feed_cache.invalidate)
+invalidation.subscribe("upvote", feed_cache.invalidate)
@@ -16,6 +16,54 @@ class Settings(BaseSettings):
         secret_key (str): Secret key used for cryptographic signing
         algorithm (str): Algorithm used for token encoding/decoding
         access_token_expire_minutes (int): Expiration time for access tokens in minutes
+        feed_cache_ttl_seconds (float): Seconds a cached GET /posts page is served as fresh
+        feed_cache_stale_seconds (float): Seconds past the TTL a page is served while it refreshes
+        feed_cache_max_entries (int): Maximum number of cached GET /posts pages
+        invalidation_channel (str): Postgres NOTIFY channel carrying cache invalidation events
+        post_batch_max_ids (int): Maximum number of IDs accepted by GET /posts/batch
+        posts_partitioning (bool): Whether posts and upvotes are partitioned (see app.partitions)
+        partition_months_ahead (int): Number of future monthly posts partitions kept ready
+        partition_retention_months (int): Number of past months of posts kept attached
+        partition_archive_schema (str): Schema receiving detached posts partitions
+        feed_window_days (int): Only list posts from the last N days in GET /posts, 0 for all.
+            Bounding created_at lets Postgres skip older partitions.
+        job_workers (int): Number of concurrent background job workers per process
+        job_poll_interval_seconds (float): Seconds an idle job worker waits before polling again
+        job_max_attempts (int): Attempts before a job is marked as failed
+        job_visibility_timeout_seconds (int): Seconds a claimed job stays hidden from other workers
+        job_backoff_base_seconds (float): Base of the exponential delay between job retries
+        job_defer_delay_seconds (float): Seconds jobs requested after commit are collected before
+            being enqueued together
+        profiling_enabled (bool): Install the request profiling middleware
+        profiling_token (str): Requests whose X-Profile header equals this token are profiled
+        profiling_sample_rate (float): Fraction of other requests profiled at random
+        profiling_dir (str): Directory receiving the flamegraph files
+        profiling_interval_seconds (float): Seconds between two stack samples
+        metrics_token (str): Bearer token required by GET /metrics; the endpoint answers 404
+            while it is empty
+        idempotency_ttl_seconds (int): Seconds an idempotency key's response is replayed
+        idempotency_sweep_interval_seconds (int): Seconds between two sweeps of expired keys
+        idempotency_sweep_batch_size (int): Expired keys deleted per sweep transaction
+        suggest_max_entries (int): Maximum number of (prefix, post) entries held by the typeahead index
+        suggest_max_scan (int): Maximum number of posts examined per long typeahead prefix
+        suggest_refresh_delay_seconds (float): Seconds post and vote events are batched before
+            the typeahead index reloads the changed posts
+        web_host (str): Address the `python -m app` server binds to
+        web_port (int): Port the `python -m app` server binds to
+        web_concurrency (int): Number of server worker processes, 0 for one per CPU
+        web_keep_alive_seconds (int): Seconds an idle keep-alive connection is kept open
+        web_backlog (int): Maximum number of connections waiting to be accepted
+        web_graceful_timeout_seconds (int): Seconds in-flight requests get to finish on shutdown
+        db_connection_budget (int): Postgres connections shared by all worker processes;
+            each worker gets an equal share, holding its LISTEN connection and a background
+            pool of job_workers + 3, and the rest for requests. The budget is divided by
+            web_concurrency when set, otherwise a process takes it all. `python -m app`
+            clamps the worker count so every worker has at least one request connection
+        db_pool_timeout_seconds (float): Seconds a request waits for a pooled connection
+        user_stats_reconcile_interval_seconds (int): Seconds between two repairs of the user_stats counters
+        user_stats_reconcile_batch_size (int): Range of user IDs repaired per reconcile transaction
+        post_repository (str): Storage behind the /posts handlers: "sqlalchemy" (the default)
+            for Postgres, or "memory" to keep posts in process memory and run without Postgres
 
     The Config class within Settings specifies that these settings should be read from a .env file.
 
@@ -29,6 +77,45 @@ class Settings(BaseSettings):
     secret_key: str
     algorithm: str
     access_token_expire_minutes: int
+    feed_cache_ttl_seconds: float = 2.0
+    feed_cache_stale_seconds: float = 30.0
+    feed_cache_max_entries: int = 512
+    invalidation_channel: str = "cache_invalidation"
+    post_batch_max_ids: int = 100
+    posts_partitioning: bool = False
+    partition_months_ahead: int = 3
+    partition_retention_months: int = 12
+    partition_archive_schema: str = "archive"
+    feed_window_days: int = 0
+    job_workers: int = 4
+    job_poll_interval_seconds: float = 1.0
+    job_max_attempts: int = 5
+    job_visibility_timeout_seconds: int = 300
+    job_backoff_base_seconds: float = 2.0
+    job_defer_delay_seconds: float = 1.0
+    profiling_enabled: bool = False
+    profiling_token: str = ""
+    profiling_sample_rate: float = 0.0
+    profiling_dir: str = "profiles"
+    profiling_interval_seconds: float = 0.005
+    metrics_token: str = ""
+    idempotency_ttl_seconds: int = 86400
+    idempotency_sweep_interval_seconds: int = 300
+    idempotency_sweep_batch_size: int = 1000
+    suggest_max_entries: int = 500000
+    suggest_max_scan: int = 2000
+    suggest_refresh_delay_seconds: float = 1.0
+    web_host: str = "0.0.0.0"
+    web_port: int = 8000
+    web_concurrency: int = 0
+    web_keep_alive_seconds: int = 5
+    web_backlog: int = 2048
+    web_graceful_timeout_seconds: int = 30
+    db_connection_budget: int = 90
+    db_pool_timeout_seconds: float = 30.0
+    user_stats_reconcile_interval_seconds: int = 3600
+    user_stats_reconcile_batch_size: int = 1000
+    post_repository: str = "sqlalchemy"
 
     class Config:
         env_file = ".env"
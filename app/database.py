@@ -1,5 +1,6 @@
 # Import necessary modules from SQLAlchemy
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, default
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -9,16 +10,100 @@ from psycopg2.extras import RealDictCursor
 
 # Import time module for potential connection retry delays
 import time
+import os
 
 # Import settings from local config file
 from .config import settings
+from .metrics import metrics
 
 # Construct the database URL using settings
 # Format: postgresql://<username>:<password>@<hostname>:<port>/<database_name>
 SQLALCHEMY_DATABASE_URL = f'postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}'
 
-# Create SQLAlchemy engine
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+def background_pool_size():
+    """
+    Connections each worker reserves for its background work.
+
+    One per job worker, one per feed cache refresh thread (app.cache runs
+    two), and one shared by the job scheduler and the suggestion index.
+    """
+    return settings.job_workers + 3
+
+def max_workers(budget: int, background: int):
+    """
+    Most worker processes the budget can serve, each with its LISTEN
+    connection, its background pool and at least one request connection.
+    """
+    return budget // (background + 2)
+
+def sharing_workers():
+    """
+    Number of worker processes sharing the connection budget.
+
+    web_concurrency when set; the `python -m app` launcher exports its
+    resolved worker count as WEB_CONCURRENCY, so every worker process sees
+    the same count. Otherwise this process is sized as the only one, as
+    under plain uvicorn, the tests and the maintenance commands.
+    """
+    return settings.web_concurrency or 1
+
+def pool_size(budget: int, workers: int, background: int):
+    """
+    Size of one worker's request pool so all workers together stay within the budget.
+
+    Each worker also holds one LISTEN connection (see app.invalidation) and
+    its background pool, so both are taken out of the worker's share.
+
+    Args:
+        budget (int): Postgres connections available to the whole application.
+        workers (int): Number of worker processes sharing them.
+        background (int): Size of each worker's background pool.
+
+    Returns:
+        int: The pool size.
+
+    Raises:
+        ValueError: If the share leaves no connection for requests.
+    """
+    size = budget // workers - 1 - background
+    if size < 1:
+        raise ValueError(f"db_connection_budget {budget} cannot serve {workers} workers, "
+                         f"at most {max_workers(budget, background)}")
+    return size
+
+# Create SQLAlchemy engines
+# Requests and background work get separate pools, so a burst of requests
+# cannot starve the job runner and background work cannot take the
+# connections requests wait for. Neither pool overflows, so the connection
+# budget is a hard limit; callers beyond it wait up to
+# db_pool_timeout_seconds for a free connection
+engine = create_engine(SQLALCHEMY_DATABASE_URL,
+                       pool_size=pool_size(settings.db_connection_budget, sharing_workers(), background_pool_size()),
+                       max_overflow=0,
+                       pool_timeout=settings.db_pool_timeout_seconds)
+background_engine = create_engine(SQLALCHEMY_DATABASE_URL,
+                                  pool_size=background_pool_size(),
+                                  max_overflow=0,
+                                  pool_timeout=settings.db_pool_timeout_seconds)
+
+# Metric names for each outcome of the compiled statement cache lookup
+_COMPILED_CACHE_OUTCOMES = {
+    default.CACHE_HIT: "sql.compiled_cache.hit",
+    default.CACHE_MISS: "sql.compiled_cache.miss",
+    default.NO_CACHE_KEY: "sql.compiled_cache.no_cache_key",
+}
+
+@event.listens_for(Engine, "after_cursor_execute")
+def record_compiled_cache_outcome(conn, cursor, statement, parameters, context, executemany):
+    """
+    Count whether each executed statement reused a compiled form from the engine's cache.
+
+    A miss means the SQL was compiled in Python for this execution, so a steady
+    miss rate points at statements that are rebuilt with different shapes.
+    """
+    name = _COMPILED_CACHE_OUTCOMES.get(getattr(context, "cache_hit", None))
+    if name is not None:
+        metrics.inc(name)
 
 # Create SessionLocal class
 # autocommit=False: Transactions are not automatically committed
@@ -26,6 +111,9 @@ engine = create_engine(SQLALCHEMY_DATABASE_URL)
 # bind=engine: Bind the session to our database engine
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Sessions of the job runner, cache refreshes and suggestion index, from the background pool
+BackgroundSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=background_engine)
+
 # Create a base class for declarative class definitions
 Base = declarative_base()
 
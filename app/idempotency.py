@@ -0,0 +1,150 @@
+# Import standard library modules
+import hashlib
+import json
+
+# Import necessary modules from FastAPI
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+# Import SQLAlchemy modules
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Import local modules
+from . import jobs
+from .config import settings
+from .metrics import metrics
+
+# Longest Idempotency-Key header accepted
+MAX_KEY_LENGTH = 255
+
+# Claims a key for this transaction. A live key held by an uncommitted request
+# makes this wait for it; an expired key is taken over. Nothing is returned
+# when a live key already exists, which means its response is stored.
+_CLAIM = text("""
+    INSERT INTO idempotency_keys (user_id, key, request_hash, expires_at)
+    VALUES (:user_id, :key, :request_hash, now() + make_interval(secs => :ttl))
+    ON CONFLICT (user_id, key) DO UPDATE
+        SET request_hash = EXCLUDED.request_hash, status_code = NULL,
+            response = NULL, expires_at = EXCLUDED.expires_at
+        WHERE idempotency_keys.expires_at < now()
+    RETURNING key
+""")
+
+_STORED = text("""
+    SELECT request_hash, status_code, response FROM idempotency_keys
+    WHERE user_id = :user_id AND key = :key
+""")
+
+_FINISH = text("""
+    UPDATE idempotency_keys SET status_code = :status_code, response = CAST(:response AS JSON)
+    WHERE user_id = :user_id AND key = :key
+""")
+
+_SWEEP = text("""
+    DELETE FROM idempotency_keys WHERE ctid = ANY (ARRAY(
+        SELECT ctid FROM idempotency_keys WHERE expires_at < now() LIMIT :batch_size))
+""")
+
+
+def fingerprint(route: str, body: dict):
+    """
+    Hash a request so a key reused for a different request can be detected.
+
+    Args:
+        route (str): The method and route, e.g. "POST /posts".
+        body (dict): The validated request body.
+
+    Returns:
+        str: The hex digest of the request.
+    """
+    payload = json.dumps([route, jsonable_encoder(body)], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def begin(db: Session, user_id: int, key: str, request_hash: str):
+    """
+    Claim an idempotency key, or return the stored response of its first use.
+
+    The claim is part of the session's transaction. If the request fails, the
+    transaction rolls back and the key is released for the next retry.
+
+    Args:
+        db (Session): The request's session.
+        user_id (int): The authenticated user.
+        key (str): The Idempotency-Key header.
+        request_hash (str): The fingerprint of this request.
+
+    Returns:
+        JSONResponse: The stored response to replay, or None if this request
+        holds the key and must run.
+
+    Raises:
+        HTTPException: 400 if the key is too long, 422 if it was used for a different request.
+    """
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+
+    while True:
+        claimed = db.execute(_CLAIM, {"user_id": user_id, "key": key, "request_hash": request_hash,
+                                      "ttl": settings.idempotency_ttl_seconds}).first()
+        if claimed is not None:
+            metrics.inc("idempotency.claimed")
+            return None
+
+        stored = db.execute(_STORED, {"user_id": user_id, "key": key}).first()
+        if stored is not None:
+            break
+        # The key expired and was swept between the claim and the read; claim it again
+        metrics.inc("idempotency.claim_retried")
+
+    # The claim and this read are separate statements; end the read-only transaction
+    db.rollback()
+    if stored.request_hash != request_hash:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail="Idempotency-Key was already used for a different request")
+
+    metrics.inc("idempotency.replayed")
+    return JSONResponse(status_code=stored.status_code, content=stored.response,
+                        headers={"Idempotent-Replayed": "true"})
+
+
+def finish(db: Session, user_id: int, key: str, status_code: int, body):
+    """
+    Store the response of a request that holds an idempotency key.
+
+    Must run in the same transaction as the request's writes, before it commits.
+
+    Args:
+        db (Session): The request's session.
+        user_id (int): The authenticated user.
+        key (str): The Idempotency-Key header.
+        status_code (int): The HTTP status of the response.
+        body: The response body, in the shape the client receives.
+    """
+    db.execute(_FINISH, {"user_id": user_id, "key": key, "status_code": status_code,
+                         "response": json.dumps(jsonable_encoder(body))})
+
+
+@jobs.handler("idempotency.sweep")
+def sweep_expired(db: Session):
+    """
+    Delete expired idempotency keys in batches.
+
+    Each batch is its own transaction so the sweep never holds many row
+    locks or builds one large transaction.
+
+    Args:
+        db (Session): A session owned by the job runner.
+    """
+    while True:
+        deleted = db.execute(_SWEEP, {"batch_size": settings.idempotency_sweep_batch_size}).rowcount
+        db.commit()
+        metrics.inc("idempotency.swept", deleted)
+        if deleted < settings.idempotency_sweep_batch_size:
+            return
+
+
+jobs.schedule("idempotency.sweep", settings.idempotency_sweep_interval_seconds)
@@ -0,0 +1,196 @@
+# Import standard library modules
+import json
+import logging
+import select
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+# Import psycopg2 for the dedicated LISTEN connection
+import psycopg2
+import psycopg2.extensions
+
+# Import SQLAlchemy modules
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+# Import local modules
+from .config import settings
+from .database import SQLALCHEMY_DATABASE_URL
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Handlers keyed by event kind ("post", "user", "upvote")
+_handlers = defaultdict(list)
+
+# Identifies this worker process so it can skip its own notifications
+_ORIGIN = uuid.uuid4().hex
+
+# Key in Session.info holding events to dispatch locally once the session commits
+_PENDING_KEY = "pending_invalidations"
+
+
+def subscribe(kind: str, handler):
+    """
+    Register a handler for change events of one kind.
+
+    Args:
+        kind (str): The event kind, such as "post", "user" or "upvote".
+        handler (callable): Called with the changed entity ID, or None when
+            every cached entity of that kind must be treated as changed.
+    """
+    _handlers[kind].append(handler)
+
+
+def publish(db: Session, kind: str, id: int = None):
+    """
+    Publish a change event as part of the session's current transaction.
+
+    The NOTIFY is delivered to other workers only if the transaction commits,
+    and this worker's own handlers run right after that commit.
+
+    Args:
+        db (Session): The session performing the write.
+        kind (str): The event kind, such as "post", "user" or "upvote".
+        id (int): The ID of the changed entity, if there is a single one.
+    """
+    event_data = {"kind": kind, "id": id, "ts": time.time(), "origin": _ORIGIN}
+    db.execute(text("SELECT pg_notify(:channel, :payload)"),
+               {"channel": settings.invalidation_channel, "payload": json.dumps(event_data)})
+    db.info.setdefault(_PENDING_KEY, []).append(event_data)
+    metrics.inc("invalidation.published")
+
+
+def dispatch(kind: str, id: int = None):
+    """
+    Run this worker's handlers for one change event.
+
+    Args:
+        kind (str): The event kind.
+        id (int): The ID of the changed entity, or None for all of them.
+    """
+    for handler in _handlers.get(kind, ()):
+        try:
+            handler(id)
+        except Exception:
+            logger.exception("invalidation handler failed for %s %s", kind, id)
+
+
+def dispatch_all():
+    """
+    Run every handler as if everything had changed.
+
+    Used after (re)connecting the listener, since events sent while it was
+    disconnected are lost.
+    """
+    for kind in list(_handlers):
+        dispatch(kind, None)
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_pending(session):
+    # The writing worker does not wait for its own NOTIFY to see its writes
+    for event_data in session.info.pop(_PENDING_KEY, ()):
+        dispatch(event_data["kind"], event_data["id"])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+class InvalidationListener:
+    """
+    Background thread that LISTENs for change events from other workers.
+
+    It holds one dedicated Postgres connection outside the SQLAlchemy pool,
+    reconnects with exponential backoff when that connection drops, and
+    records the delay between publish and delivery.
+    """
+
+    def __init__(self, dsn: str, channel: str):
+        self.dsn = dsn
+        self.channel = channel
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Start the listener thread.
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="invalidation-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the listener thread and wait for it to exit.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        attempt = 0
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(self.dsn)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                if attempt:
+                    metrics.inc("invalidation.reconnects")
+                    # Events published while disconnected were lost
+                    dispatch_all()
+                attempt = 0
+                metrics.set("invalidation.connected", 1)
+                self._listen(conn)
+            except Exception as error:
+                # Anything else escaping _listen would end the thread and leave every cache stale
+                metrics.set("invalidation.connected", 0)
+                attempt += 1
+                delay = min(2 ** attempt, 30)
+                if isinstance(error, psycopg2.Error):
+                    logger.warning("invalidation listener disconnected (%s), retrying in %ss", error, delay)
+                else:
+                    logger.exception("invalidation listener failed, reconnecting in %ss", delay)
+                self._stop.wait(delay)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def _listen(self, conn):
+        while not self._stop.is_set():
+            # Wake up periodically to notice stop requests
+            if select.select([conn], [], [], 1.0) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                self._handle(conn.notifies.pop(0).payload)
+
+    def _handle(self, payload: str):
+        try:
+            event_data = json.loads(payload)
+        except ValueError:
+            event_data = None
+        if (not isinstance(event_data, dict) or not isinstance(event_data.get("kind"), str)
+                or not isinstance(event_data.get("ts"), (int, float))):
+            metrics.inc("invalidation.malformed")
+            logger.warning("ignoring malformed invalidation payload %r", payload)
+            return
+
+        metrics.inc("invalidation.received")
+        metrics.observe("invalidation.delivery_lag_seconds", max(0.0, time.time() - event_data["ts"]))
+
+        # This worker's handlers already ran when the write committed
+        if event_data.get("origin") == _ORIGIN:
+            return
+        dispatch(event_data["kind"], event_data.get("id"))
+
+
+# Listener started and stopped by the application lifespan
+listener = InvalidationListener(SQLALCHEMY_DATABASE_URL, settings.invalidation_channel)
@@ -0,0 +1,322 @@
+# Import standard library modules
+import asyncio
+import logging
+import threading
+import time
+
+# Import SQLAlchemy modules
+from sqlalchemy import event, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+# Import local modules
+from . import models
+from .config import settings
+from .database import BackgroundSessionLocal
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Handlers keyed by job kind
+_handlers = {}
+
+# Recurring jobs as (kind, interval in seconds)
+_schedules = []
+
+# Key in Session.info holding job kinds to enqueue once the session commits
+_AFTER_COMMIT_KEY = "jobs_after_commit"
+
+# Claims due jobs by hiding them for the visibility timeout; SKIP LOCKED lets
+# every worker of every process claim concurrently without waiting on each other
+_CLAIM = text("""
+    UPDATE jobs SET attempts = attempts + 1,
+                    run_at = now() + make_interval(secs => :visibility_timeout)
+    WHERE id IN (
+        SELECT id FROM jobs
+        WHERE status = 'pending' AND run_at <= now()
+        ORDER BY run_at
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, kind, payload, attempts
+""")
+
+_QUEUE_STATS = text("""
+    SELECT count(*), EXTRACT(EPOCH FROM now() - min(run_at))
+    FROM jobs WHERE status = 'pending' AND run_at <= now()
+""")
+
+
+def handler(kind: str):
+    """
+    Register a function as the handler of one job kind.
+
+    The handler is called as handler(db, **payload) in a worker thread with
+    its own session. Its changes are committed together with the removal of
+    the job, but side effects outside the database may still run twice, since
+    jobs are delivered at least once.
+
+    Args:
+        kind (str): The job kind.
+
+    Returns:
+        callable: The decorator.
+    """
+    def register(fn):
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+def enqueue(db: Session, kind: str, payload: dict = None, dedupe_key: str = None):
+    """
+    Add a job to the queue as part of the session's current transaction.
+
+    Args:
+        db (Session): The session performing the write the job derives from.
+        kind (str): The job kind.
+        payload (dict): Keyword arguments for the handler.
+        dedupe_key (str): If set, the job is dropped while another unclaimed
+            job with the same key is already waiting.
+    """
+    statement = insert(models.Job).values(kind=kind, payload=payload or {}, dedupe_key=dedupe_key)
+    if dedupe_key is not None:
+        statement = statement.on_conflict_do_nothing(
+            index_elements=["dedupe_key"], index_where=text("status = 'pending' AND attempts = 0"))
+    db.execute(statement)
+
+
+def enqueue_after_commit(db: Session, kind: str):
+    """
+    Request a job of one kind for when the session's transaction commits.
+
+    Nothing is written in the caller's transaction, so hot writes never wait
+    on the dedupe key of a job another transaction is inserting. The job is
+    enqueued shortly after the commit, coalesced with the requests of this
+    process (see DeferredEnqueue), and is lost if the process exits first:
+    use it for work that is worth doing but not required, like cache warming.
+
+    Args:
+        db (Session): The session performing the write the job derives from.
+        kind (str): The job kind, which takes no payload.
+    """
+    db.info.setdefault(_AFTER_COMMIT_KEY, set()).add(kind)
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_committed(session):
+    for kind in session.info.pop(_AFTER_COMMIT_KEY, ()):
+        deferred.add(kind)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_uncommitted(session):
+    session.info.pop(_AFTER_COMMIT_KEY, None)
+
+
+class DeferredEnqueue:
+    """
+    Enqueues the jobs requested by committed transactions, outside of them.
+
+    Kinds requested within delay seconds are enqueued together, once each
+    and deduplicated by kind, in one short transaction of a background
+    session. A burst of writes costs this process one INSERT per kind per
+    delay instead of one per write.
+
+    Attributes:
+        session_factory (callable): Creates the session the jobs are enqueued with
+        delay (float): Seconds requests are collected before enqueueing
+    """
+
+    def __init__(self, session_factory, delay: float):
+        self.session_factory = session_factory
+        self.delay = delay
+        self._kinds = set()
+        self._flush_scheduled = False
+        self._lock = threading.Lock()
+
+    def add(self, kind: str):
+        """
+        Enqueue a job of one kind within delay seconds.
+
+        Args:
+            kind (str): The job kind, which takes no payload.
+        """
+        with self._lock:
+            self._kinds.add(kind)
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        timer = threading.Timer(self.delay, self._flush)
+        timer.daemon = True
+        timer.start()
+
+    def _flush(self):
+        with self._lock:
+            kinds, self._kinds = self._kinds, set()
+            self._flush_scheduled = False
+        db = self.session_factory()
+        try:
+            for kind in sorted(kinds):
+                enqueue(db, kind, dedupe_key=kind)
+            db.commit()
+            metrics.inc("jobs.deferred_enqueued", len(kinds))
+        except Exception:
+            logger.exception("enqueueing deferred jobs %s failed", sorted(kinds))
+        finally:
+            db.close()
+
+
+def schedule(kind: str, seconds: float):
+    """
+    Enqueue a job of one kind every interval while the runner is started.
+
+    Every process schedules it, but the dedupe key keeps a single waiting
+    job, so the job runs about once per interval across all workers.
+
+    Args:
+        kind (str): The job kind, which takes no payload.
+        seconds (float): The interval between two runs.
+    """
+    _schedules.append((kind, seconds))
+
+
+class JobRunner:
+    """
+    Pool of asyncio workers that run queued jobs in threads.
+
+    Each worker claims one job at a time, runs its handler off the event loop,
+    then deletes the job on success or schedules a retry with exponential
+    backoff. After job_max_attempts the job is kept with status "failed".
+    """
+
+    def __init__(self, session_factory, workers: int):
+        self.session_factory = session_factory
+        self.workers = workers
+        self._tasks = []
+        self._stopping = None
+
+    async def start(self):
+        """
+        Start the worker tasks, the recurring job tasks and the queue metrics task.
+        """
+        self._stopping = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks += [asyncio.create_task(self._enqueue_every(kind, seconds)) for kind, seconds in _schedules]
+        self._tasks.append(asyncio.create_task(self._sample_queue()))
+
+    async def stop(self):
+        """
+        Stop claiming jobs and wait for the jobs in progress to finish.
+        """
+        self._stopping.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _sleep(self, seconds: float):
+        # Sleep that ends early when the runner is stopped
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _work(self):
+        while not self._stopping.is_set():
+            try:
+                job = await asyncio.to_thread(self._claim)
+            except Exception:
+                logger.exception("claiming a job failed")
+                job = None
+            if job is None:
+                await self._sleep(settings.job_poll_interval_seconds)
+                continue
+            try:
+                await asyncio.to_thread(self._run, job)
+            except Exception:
+                # Recording the outcome failed too, e.g. the database is down; the
+                # job becomes due again once its visibility timeout expires
+                logger.exception("recording the outcome of job %s failed", job.id)
+                await self._sleep(settings.job_poll_interval_seconds)
+
+    async def _enqueue_every(self, kind: str, seconds: float):
+        while True:
+            await self._sleep(seconds)
+            if self._stopping.is_set():
+                return
+            try:
+                await asyncio.to_thread(self._enqueue_scheduled, kind)
+            except Exception:
+                logger.exception("scheduling job %s failed", kind)
+
+    async def _sample_queue(self):
+        while not self._stopping.is_set():
+            try:
+                depth, lag = await asyncio.to_thread(self._queue_stats)
+                metrics.set("jobs.queue_depth", depth)
+                metrics.set("jobs.lag_seconds", float(lag or 0))
+            except Exception:
+                logger.exception("sampling the job queue failed")
+            await self._sleep(5)
+
+    def _claim(self):
+        db = self.session_factory()
+        try:
+            row = db.execute(_CLAIM, {"visibility_timeout": settings.job_visibility_timeout_seconds,
+                                      "limit": 1}).first()
+            db.commit()
+            return row
+        finally:
+            db.close()
+
+    def _enqueue_scheduled(self, kind: str):
+        db = self.session_factory()
+        try:
+            enqueue(db, kind, dedupe_key=kind)
+            db.commit()
+        finally:
+            db.close()
+
+    def _queue_stats(self):
+        db = self.session_factory()
+        try:
+            return db.execute(_QUEUE_STATS).first()
+        finally:
+            db.close()
+
+    def _run(self, job):
+        start = time.monotonic()
+        db = self.session_factory()
+        try:
+            fn = _handlers.get(job.kind)
+            if fn is None:
+                raise LookupError(f"no handler registered for job kind {job.kind!r}")
+            fn(db, **job.payload)
+            db.query(models.Job).filter(models.Job.id == job.id).delete(synchronize_session=False)
+            db.commit()
+            metrics.inc("jobs.succeeded")
+        except Exception as error:
+            db.rollback()
+            logger.warning("job %s (%s) attempt %s failed: %s", job.id, job.kind, job.attempts, error)
+            self._fail(db, job, error)
+        finally:
+            db.close()
+            metrics.observe("jobs.run_seconds", time.monotonic() - start)
+
+    def _fail(self, db: Session, job, error: Exception):
+        if job.attempts >= settings.job_max_attempts:
+            values = {"status": "failed"}
+            metrics.inc("jobs.failed")
+        else:
+            delay = settings.job_backoff_base_seconds ** job.attempts
+            values = {"run_at": text("now() + make_interval(secs => :delay)").bindparams(delay=delay)}
+            metrics.inc("jobs.retried")
+        values["last_error"] = str(error)[:1000]
+        db.query(models.Job).filter(models.Job.id == job.id).update(values, synchronize_session=False)
+        db.commit()
+
+
+# Runner started and stopped by the application lifespan
+runner = JobRunner(BackgroundSessionLocal, settings.job_workers)
+
+# Enqueues the jobs requested with enqueue_after_commit
+deferred = DeferredEnqueue(BackgroundSessionLocal, settings.job_defer_delay_seconds)
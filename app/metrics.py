@@ -0,0 +1,72 @@
+# Import standard library modules
+import threading
+
+
+class Metrics:
+    """
+    Minimal in-process metrics registry.
+
+    Counters only go up, gauges hold the last value set, and observations keep
+    a count, sum and maximum so averages can be derived from a snapshot.
+    Each worker process keeps its own registry.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._gauges = {}
+        self._observations = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: int = 1):
+        """
+        Increment a counter.
+
+        Args:
+            name (str): The counter name.
+            value (int): The amount to add.
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set(self, name: str, value: float):
+        """
+        Set a gauge to its current value.
+
+        Args:
+            name (str): The gauge name.
+            value (float): The current value.
+        """
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        """
+        Record one observation, such as a latency.
+
+        Args:
+            name (str): The observation name.
+            value (float): The observed value.
+        """
+        with self._lock:
+            stats = self._observations.setdefault(name, {"count": 0, "sum": 0.0, "max": 0.0})
+            stats["count"] += 1
+            stats["sum"] += value
+            stats["max"] = max(stats["max"], value)
+
+    def snapshot(self):
+        """
+        Return a copy of every metric.
+
+        Returns:
+            dict: Counters, gauges and observations keyed by name.
+        """
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "observations": {name: dict(stats) for name, stats in self._observations.items()},
+            }
+
+
+# Registry shared by the whole worker process
+metrics = Metrics()
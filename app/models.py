@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Index, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.expression import text
 from sqlalchemy.sql.sqltypes import TIMESTAMP
 
+from .config import settings
 from .database import Base
 
 class Post(Base):
@@ -17,14 +18,24 @@ class Post(Base):
         created_at (datetime): The timestamp when the post was created.
         owner_id (int): The ID of the user who created the post.
         owner (User): The relationship to the User who owns this post.
+
+    The composite (owner_id, created_at) index serves the per-user feed, which
+    filters on the owner and pages backwards through created_at.
+
+    With posts_partitioning the primary key is (id, created_at), as in the
+    tables app.partitions creates. create_all does not partition the table
+    itself; run `python -m app.partitions enable` for that.
     """
     __tablename__ = "posts"
+    __table_args__ = (
+        Index("ix_posts_owner_id_created_at", "owner_id", "created_at"),
+    )
 
-    id = Column(Integer, primary_key=True, nullable=False)
+    id = Column(Integer, primary_key=True, autoincrement=True, nullable=False)
     title = Column(String, nullable=False)
     content = Column(String, nullable=False)
     published = Column(Boolean, server_default='TRUE', nullable=False)
-    created_at = Column(TIMESTAMP(timezone=True),
+    created_at = Column(TIMESTAMP(timezone=True), primary_key=settings.posts_partitioning,
                         nullable=False, server_default=text('now()'))
     owner_id = Column(Integer, ForeignKey(
         "users.id", ondelete="CASCADE"), nullable=False)
@@ -60,9 +71,104 @@ class Upvote(Base):
     Attributes:
         user_id (int): The ID of the user who made the upvote.
         post_id (int): The ID of the post that was upvoted.
+
+    With posts_partitioning there is no foreign key to posts, which Postgres
+    cannot reference by id alone (see app.partitions).
     """
     __tablename__ = "upvotes"
     user_id = Column(Integer, ForeignKey(
         "users.id", ondelete="CASCADE"), primary_key=True)
-    post_id = Column(Integer, ForeignKey(
-        "posts.id", ondelete="CASCADE"), primary_key=True)
+    if settings.posts_partitioning:
+        post_id = Column(Integer, primary_key=True)
+    else:
+        post_id = Column(Integer, ForeignKey(
+            "posts.id", ondelete="CASCADE"), primary_key=True)
+
+
+class UserStats(Base):
+    """
+    Represents the aggregate counters shown on a user's profile.
+
+    The counters are updated in the same transaction as the post or upvote
+    writes they count (see app.user_stats), so reading them costs one primary
+    key lookup instead of two aggregates over posts and upvotes. A user with
+    no row yet has written nothing and received no votes.
+
+    Attributes:
+        user_id (int): The ID of the user the counters belong to.
+        posts_written (int): The number of posts the user owns.
+        votes_received (int): The number of upvotes on the user's posts.
+    """
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey(
+        "users.id", ondelete="CASCADE"), primary_key=True)
+    posts_written = Column(Integer, nullable=False, server_default=text('0'))
+    votes_received = Column(Integer, nullable=False, server_default=text('0'))
+
+
+class Job(Base):
+    """
+    Represents a background job in the durable job queue.
+
+    Jobs are inserted in the same transaction as the write that needs them,
+    so a job exists if and only if that write committed. A worker claims a
+    job by pushing run_at past a visibility timeout; the row is deleted once
+    the job succeeds, so a crashed worker's job becomes due again.
+
+    Attributes:
+        id (int): The unique identifier for the job.
+        kind (str): The registered handler that runs the job.
+        payload (dict): The arguments passed to the handler.
+        status (str): "pending" until the job exhausts its attempts, then "failed".
+        attempts (int): The number of times the job has been claimed.
+        run_at (datetime): The earliest time the job may be claimed.
+        dedupe_key (str): Optional key; only one unclaimed pending job may hold it.
+        last_error (str): The error raised by the last failed attempt.
+        created_at (datetime): The timestamp when the job was enqueued.
+    """
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+        Index("ux_jobs_pending_dedupe_key", "dedupe_key", unique=True,
+              postgresql_where=text("status = 'pending' AND attempts = 0")),
+    )
+
+    id = Column(Integer, primary_key=True, nullable=False)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False, server_default=text("'{}'"))
+    status = Column(String, nullable=False, server_default=text("'pending'"))
+    attempts = Column(Integer, nullable=False, server_default=text('0'))
+    run_at = Column(TIMESTAMP(timezone=True),
+                    nullable=False, server_default=text('now()'))
+    dedupe_key = Column(String, nullable=True)
+    last_error = Column(String, nullable=True)
+    created_at = Column(TIMESTAMP(timezone=True),
+                        nullable=False, server_default=text('now()'))
+
+
+class IdempotencyKey(Base):
+    """
+    Represents the stored response of a write request sent with an Idempotency-Key header.
+
+    The row is inserted at the start of the request's transaction and filled
+    with the response before it commits, so a retry either waits for the
+    original request or finds its response; a failed request leaves no row.
+
+    Attributes:
+        user_id (int): The ID of the user who sent the request.
+        key (str): The client-chosen idempotency key.
+        request_hash (str): Fingerprint of the request the key was first used with.
+        status_code (int): The HTTP status of the stored response.
+        response (dict): The stored response body.
+        expires_at (datetime): When the key may be reused and the row swept.
+    """
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, ForeignKey(
+        "users.id", ondelete="CASCADE"), primary_key=True)
+    key = Column(String, primary_key=True)
+    request_hash = Column(String, nullable=False)
+    status_code = Column(Integer, nullable=True)
+    response = Column(JSON, nullable=True)
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False, index=True)
@@ -1,6 +1,6 @@
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from . import schemas, database, models
+from . import schemas, database, models, queries
 from fastapi import Depends, status, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
@@ -48,7 +48,7 @@ def verify_access_token(token: str, credentials_exception):
     """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        id: str = payload.get("user_id")
+        id: int = payload.get("user_id")
         if id is None:
             raise credentials_exception
         token_data = schemas.TokenData(id=id)
@@ -81,5 +81,29 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     )
 
     token = verify_access_token(token, credentials_exception)
-    user = db.query(models.User).filter(models.User.id == token.id).first()
+    user = db.execute(queries.USER_BY_ID, {"id": token.id}).scalars().first()
     return user
+
+def get_current_user_id(token: str = Depends(oauth2_scheme)):
+    """
+    Get the ID of the authenticated user from the token alone.
+
+    Unlike get_current_user this does not load the user, so it works without
+    a database, e.g. with the in-memory post repository.
+
+    Args:
+        token (str): The JWT token from the request.
+
+    Returns:
+        int: The ID of the authenticated user.
+
+    Raises:
+        HTTPException: If the credentials are invalid.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"}
+    )
+
+    return verify_access_token(token, credentials_exception).id
@@ -0,0 +1,239 @@
+"""
+Range partitioning of posts by created_at, with an archival tier.
+
+posts is split into one partition per calendar month (posts_pYYYYMM), plus a
+default partition that catches rows outside the prepared range. upvotes has no
+timestamp of its own, so it is hash partitioned by post_id instead. That bounds
+index and vacuum size per partition, and every vote aggregate for a post reads
+a single partition.
+
+Postgres cannot point a foreign key at posts(id) alone once created_at is part
+of the primary key. So upvotes loses its post_id foreign key, and delete_post
+removes a post's upvotes itself when partitioning is enabled.
+
+Usage:
+    python -m app.partitions enable     # one-time conversion of existing tables
+    python -m app.partitions maintain   # run periodically, e.g. daily from cron
+"""
+import argparse
+import re
+from datetime import date
+
+from sqlalchemy import text
+
+from .config import settings
+from .database import engine
+
+# Number of hash partitions of upvotes
+UPVOTE_PARTITIONS = 8
+
+# Extracts the upper bound from pg_get_expr(relpartbound), e.g. "... TO ('2026-11-01 00:00:00+00')"
+_UPPER_BOUND = re.compile(r"TO \('(\d{4})-(\d{2})-(\d{2})")
+
+
+def add_months(month: date, months: int):
+    """
+    Shift the first day of a month by a number of months.
+
+    Args:
+        month (date): The first day of a month.
+        months (int): The number of months to add, may be negative.
+
+    Returns:
+        date: The first day of the resulting month.
+    """
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date):
+    """
+    Name of the posts partition holding one month.
+
+    Args:
+        month (date): The first day of the month.
+
+    Returns:
+        str: The partition table name, e.g. posts_p202610.
+    """
+    return f"posts_p{month:%Y%m}"
+
+
+def create_month_partition(conn, month: date):
+    """
+    Create the posts partition for one month if it does not exist yet.
+
+    Posts of that month written before the partition existed are in the
+    default partition, which would make attaching the new one fail, so they
+    are moved into it first.
+
+    Args:
+        conn (Connection): A connection inside a transaction.
+        month (date): The first day of the month.
+    """
+    name = partition_name(month)
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+        return
+    bounds = {"start": month, "end": add_months(month, 1)}
+    conn.execute(text(f"CREATE TABLE {name} (LIKE posts INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    if conn.execute(text("SELECT to_regclass('posts_default')")).scalar() is not None:
+        conn.execute(text(
+            f"WITH moved AS (DELETE FROM posts_default WHERE created_at >= :start AND created_at < :end "
+            f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"), bounds)
+    conn.execute(text(
+        f"ALTER TABLE posts ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{bounds['start'].isoformat()}') TO ('{bounds['end'].isoformat()}')"))
+
+
+def is_partitioned(conn):
+    """
+    Check whether posts is already a partitioned table.
+
+    Args:
+        conn (Connection): A database connection.
+
+    Returns:
+        bool: True if posts is partitioned.
+    """
+    return conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'posts'::regclass)")).scalar()
+
+
+def enable(conn, months_ahead: int):
+    """
+    Convert the existing posts and upvotes tables into partitioned tables.
+
+    The current posts table is attached unchanged as the partition for every
+    row up to the end of this month, so existing posts are not copied.
+    upvotes is rebuilt as hash partitions.
+
+    Args:
+        conn (Connection): A connection inside a transaction.
+        months_ahead (int): Number of future monthly partitions to create.
+    """
+    if is_partitioned(conn):
+        return
+
+    next_month = add_months(date.today().replace(day=1), 1)
+
+    # upvotes cannot reference posts(id) once created_at is part of its key
+    conn.execute(text("ALTER TABLE upvotes DROP CONSTRAINT IF EXISTS upvotes_post_id_fkey"))
+
+    # posts: keep the old table as the partition for everything before next month
+    conn.execute(text("ALTER TABLE posts RENAME TO posts_legacy"))
+    # A partition must carry the parent's (id, created_at) key, and a table has a single primary key
+    conn.execute(text("ALTER TABLE posts_legacy DROP CONSTRAINT posts_pkey"))
+    conn.execute(text("ALTER TABLE posts_legacy ADD CONSTRAINT posts_legacy_pkey PRIMARY KEY (id, created_at)"))
+    conn.execute(text(
+        "CREATE TABLE posts (LIKE posts_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        "PARTITION BY RANGE (created_at)"))
+    conn.execute(text("ALTER SEQUENCE posts_id_seq OWNED BY posts.id"))
+    conn.execute(text("ALTER TABLE posts ADD PRIMARY KEY (id, created_at)"))
+    conn.execute(text(
+        "ALTER TABLE posts ADD CONSTRAINT posts_owner_id_fkey "
+        "FOREIGN KEY (owner_id) REFERENCES users (id) ON DELETE CASCADE"))
+    conn.execute(text("CREATE INDEX ix_posts_part_owner_id_created_at ON posts (owner_id, created_at)"))
+    conn.execute(text("CREATE INDEX ix_posts_part_created_at ON posts (created_at)"))
+    conn.execute(text(
+        f"ALTER TABLE posts ATTACH PARTITION posts_legacy "
+        f"FOR VALUES FROM (MINVALUE) TO ('{next_month.isoformat()}')"))
+    for offset in range(months_ahead + 1):
+        create_month_partition(conn, add_months(next_month, offset))
+    conn.execute(text("CREATE TABLE posts_default PARTITION OF posts DEFAULT"))
+
+    # upvotes: hash partitions by post, filled from the old table
+    conn.execute(text("ALTER TABLE upvotes RENAME TO upvotes_legacy"))
+    conn.execute(text("ALTER TABLE upvotes_legacy RENAME CONSTRAINT upvotes_pkey TO upvotes_legacy_pkey"))
+    conn.execute(text(
+        "CREATE TABLE upvotes (user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE, "
+        "post_id INTEGER NOT NULL, PRIMARY KEY (user_id, post_id)) PARTITION BY HASH (post_id)"))
+    for remainder in range(UPVOTE_PARTITIONS):
+        conn.execute(text(
+            f"CREATE TABLE upvotes_h{remainder} PARTITION OF upvotes "
+            f"FOR VALUES WITH (MODULUS {UPVOTE_PARTITIONS}, REMAINDER {remainder})"))
+    conn.execute(text("CREATE INDEX ix_upvotes_post_id ON upvotes (post_id)"))
+    conn.execute(text("INSERT INTO upvotes (user_id, post_id) SELECT user_id, post_id FROM upvotes_legacy"))
+    conn.execute(text("DROP TABLE upvotes_legacy"))
+
+
+def maintain(conn, months_ahead: int, retention_months: int, archive_schema: str):
+    """
+    Create upcoming monthly partitions and archive the ones past retention.
+
+    Archived partitions are detached from posts and moved to the archive
+    schema together with their upvotes, so they no longer cost anything to
+    the live tables but can still be queried or re-attached.
+
+    posts_legacy, which holds every post from before enable, is never
+    archived here: it can be far larger than a month, and detaching it
+    and moving its upvotes in one transaction would hold locks on posts
+    and upvotes for that long. Archive it by hand in a maintenance window
+    once its posts are all past retention.
+
+    Args:
+        conn (Connection): A connection inside a transaction.
+        months_ahead (int): Number of future monthly partitions to keep ready.
+        retention_months (int): Number of past months kept attached.
+        archive_schema (str): Schema receiving detached partitions.
+
+    Returns:
+        list: The names of the partitions archived by this run.
+    """
+    partitions = conn.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = 'posts'::regclass")).all()
+
+    # Upper bound of each range partition; the default partition has none
+    upper_bounds = {}
+    for name, bound in partitions:
+        match = _UPPER_BOUND.search(bound or "")
+        if match is not None:
+            upper_bounds[name] = date(*map(int, match.groups()))
+
+    # Partitions are contiguous, so new ones start where the last one ends
+    this_month = date.today().replace(day=1)
+    month = max([this_month, *upper_bounds.values()])
+    while month <= add_months(this_month, months_ahead):
+        create_month_partition(conn, month)
+        month = add_months(month, 1)
+
+    cutoff = add_months(this_month, -retention_months)
+    archived = []
+    for name, upper_bound in upper_bounds.items():
+        if upper_bound > cutoff or name == "posts_legacy":
+            continue
+
+        conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {archive_schema}"))
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {archive_schema}.upvotes "
+            f"(user_id INTEGER NOT NULL, post_id INTEGER NOT NULL, PRIMARY KEY (user_id, post_id))"))
+        conn.execute(text(f"ALTER TABLE posts DETACH PARTITION {name}"))
+        conn.execute(text(
+            f"WITH moved AS (DELETE FROM upvotes WHERE post_id IN (SELECT id FROM {name}) "
+            f"RETURNING user_id, post_id) "
+            f"INSERT INTO {archive_schema}.upvotes SELECT user_id, post_id FROM moved ON CONFLICT DO NOTHING"))
+        conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {archive_schema}"))
+        archived.append(name)
+
+    return archived
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage time partitions of posts and upvotes.")
+    parser.add_argument("command", choices=["enable", "maintain"])
+    parser.add_argument("--months-ahead", type=int, default=settings.partition_months_ahead)
+    parser.add_argument("--retention-months", type=int, default=settings.partition_retention_months)
+    parser.add_argument("--archive-schema", default=settings.partition_archive_schema)
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        if args.command == "enable":
+            enable(conn, args.months_ahead)
+            print("posts and upvotes are partitioned")
+        else:
+            archived = maintain(conn, args.months_ahead, args.retention_months, args.archive_schema)
+            print(f"archived partitions: {', '.join(archived) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+# Import standard library modules
+import asyncio
+import contextvars
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+# Import local modules
+from .config import settings
+
+# Innermost frames of threads that are blocked rather than working
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+}
+
+
+# The profiler of the request being handled; threadpool calls see it through
+# the context anyio copies into the worker thread
+_request_profiler = contextvars.ContextVar("request_profiler", default=None)
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that periodically records the stack of every busy thread.
+
+    A background thread reads sys._current_frames() every `interval` seconds,
+    so the profiled code runs unmodified and pays only for the GIL switches.
+    Blocked threads are skipped.
+
+    Given the asyncio task of a request, only that request's work is
+    recorded: the event loop thread while the task is the one running, and
+    the threadpool workers (sync endpoints and dependencies) running a
+    context copied from the task. Other requests handled at the same time
+    are left out.
+
+    Attributes:
+        interval (float): Seconds between two samples
+        task (asyncio.Task): The request's task, or None to record every busy thread
+        stacks (Counter): Sample counts keyed by stack, outermost frame first
+    """
+
+    def __init__(self, interval: float, task: asyncio.Task = None):
+        self.interval = interval
+        self.task = task
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        # Created on the event loop thread when following a request
+        self._loop_thread_id = threading.get_ident()
+
+    def start(self):
+        """
+        Start sampling. When following a request, call it from the request's task.
+        """
+        if self.task is not None:
+            _request_profiler.set(self)
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop sampling and wait for the sampler thread to exit.
+        """
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                    continue
+                if self.task is not None and not self._follows(thread_id, frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def _follows(self, thread_id, frame):
+        if thread_id == self._loop_thread_id:
+            return asyncio.current_task(self.task.get_loop()) is self.task
+        # A threadpool worker runs its call inside the request's copied context,
+        # held by anyio's WorkerThread.run frame near the bottom of the stack
+        while frame is not None:
+            context = frame.f_locals.get("context") if frame.f_code.co_name == "run" else None
+            if isinstance(context, contextvars.Context):
+                return context.get(_request_profiler) is self
+            frame = frame.f_back
+        return False
+
+    def collapsed(self):
+        """
+        Render the samples in collapsed-stack format.
+
+        Returns:
+            str: One "frame;frame;frame count" line per distinct stack, as read
+            by flamegraph.pl and speedscope.
+        """
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.items())
+
+    def speedscope(self, name: str, duration_ms: float):
+        """
+        Render the samples as a speedscope sampled profile.
+
+        Args:
+            name (str): The profile name shown by speedscope.
+            duration_ms (float): The wall time covered by the profile.
+
+        Returns:
+            dict: A document in the speedscope file format.
+        """
+        frames = []
+        frame_index = {}
+        samples = []
+        weights = []
+        for stack, count in self.stacks.items():
+            indexes = []
+            for label in stack:
+                if label not in frame_index:
+                    frame_index[label] = len(frames)
+                    frames.append({"name": label})
+                indexes.append(frame_index[label])
+            samples.append(indexes)
+            weights.append(count * self.interval * 1000)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": duration_ms,
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles selected requests.
+
+    A request is profiled when its X-Profile header matches the configured
+    profiling token, or otherwise at random with the configured sample rate.
+    Only the work of that request is recorded. The
+    profile is written to the profiling directory as <id>.collapsed and
+    <id>.speedscope.json, where the file name carries the method, route,
+    status and duration, and the response gets an X-Profile-Id header.
+
+    The middleware is only installed when profiling_enabled is set, so it
+    costs nothing otherwise.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _selected(self, scope):
+        if settings.profiling_token:
+            for key, value in scope["headers"]:
+                if key == b"x-profile":
+                    if hmac.compare_digest(value, settings.profiling_token.encode()):
+                        return True
+        return random.random() < settings.profiling_sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._selected(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:12]
+        response = {"status": 500}
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        profiler = SamplingProfiler(settings.profiling_interval_seconds, asyncio.current_task())
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            # Joining the sampler thread would block the event loop
+            await asyncio.to_thread(profiler.stop)
+            duration_ms = (time.perf_counter() - start) * 1000
+            # The router stores the matched route in the scope; fall back to the raw path
+            route = getattr(scope.get("route"), "path", scope["path"])
+            await asyncio.to_thread(self._write, profiler, profile_id, scope["method"], route,
+                                    response["status"], duration_ms)
+
+    def _write(self, profiler, profile_id, method, route, status, duration_ms):
+        os.makedirs(settings.profiling_dir, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        base = os.path.join(settings.profiling_dir,
+                            f"{time.strftime('%Y%m%dT%H%M%S')}-{profile_id}-{method}-{slug}-{status}-{duration_ms:.0f}ms")
+        with open(f"{base}.collapsed", "w") as collapsed:
+            collapsed.write(profiler.collapsed())
+        with open(f"{base}.speedscope.json", "w") as speedscope:
+            json.dump(profiler.speedscope(f"{method} {route} {status} {duration_ms:.1f}ms", duration_ms), speedscope)
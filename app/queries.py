@@ -0,0 +1,66 @@
+# Import necessary modules from SQLAlchemy
+from sqlalchemy import select, func, bindparam, any_, exists, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import aliased, contains_eager
+
+# Import local modules
+from . import models
+
+# Prebuilt statements for the hot request paths.
+#
+# They are built once at import and only receive values through bind
+# parameters, so each request skips constructing the statement and reuses the
+# engine's compiled cache entry instead of recompiling the SQL.
+
+# Posts joined with their vote count; the base of the post read queries.
+# The owner is loaded by the same statement so serializing Post.owner does not
+# issue one extra query per post. Grouping by (id, created_at) keeps the other
+# post columns valid once app.partitions makes that pair the primary key.
+POST_WITH_VOTES = select(models.Post, func.count(models.Upvote.post_id).label("votes")).join(
+    models.Post.owner).outerjoin(models.Upvote, models.Upvote.post_id == models.Post.id).options(
+    contains_eager(models.Post.owner)).group_by(models.Post.id, models.Post.created_at, models.User.id)
+
+def with_voted_by_me(statement):
+    """
+    Add a voted_by_me column telling whether the viewer upvoted each post.
+
+    The EXISTS probe uses the upvotes primary key (user_id, post_id), so the
+    flag costs one index lookup per post inside the same statement. It reads
+    an alias of upvotes, since the outer join to upvotes is already used for
+    the vote count.
+
+    Args:
+        statement (Select): A statement selecting models.Post.
+
+    Returns:
+        Select: The statement with the extra column; binds: viewer_id
+    """
+    voter = aliased(models.Upvote)
+    return statement.add_columns(exists().where(
+        voter.post_id == models.Post.id, voter.user_id == bindparam("viewer_id")).label("voted_by_me"))
+
+# One page of GET /posts; binds: search, limit, skip
+FEED_PAGE = POST_WITH_VOTES.where(models.Post.title.contains(bindparam("search"))).limit(
+    bindparam("limit")).offset(bindparam("skip"))
+
+# One page of GET /posts restricted to recent posts, which lets Postgres prune
+# older partitions; binds: search, since, limit, skip
+RECENT_FEED_PAGE = FEED_PAGE.where(models.Post.created_at >= bindparam("since"))
+
+# A single post with its vote count; binds: id
+POST_BY_ID = POST_WITH_VOTES.where(models.Post.id == bindparam("id"))
+
+# Many posts with their vote counts in one round trip; binds: ids (list of int)
+POSTS_BY_IDS = POST_WITH_VOTES.where(models.Post.id == any_(bindparam("ids", type_=ARRAY(Integer))))
+
+# The post read statements with the viewer's voted_by_me flag; binds: viewer_id and the above
+FEED_PAGE_VOTED = with_voted_by_me(FEED_PAGE)
+RECENT_FEED_PAGE_VOTED = with_voted_by_me(RECENT_FEED_PAGE)
+POST_BY_ID_VOTED = with_voted_by_me(POST_BY_ID)
+POSTS_BY_IDS_VOTED = with_voted_by_me(POSTS_BY_IDS)
+
+# The authenticated user; binds: id
+USER_BY_ID = select(models.User).where(models.User.id == bindparam("id"))
+
+# The user logging in; binds: email
+USER_BY_EMAIL = select(models.User).where(models.User.email == bindparam("email"))
@@ -0,0 +1,312 @@
+# Import standard library modules
+import bisect
+import itertools
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import List, Optional
+
+# Import FastAPI and SQLAlchemy modules
+from fastapi import Depends
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+# Import local modules
+from . import models, schemas, cache, invalidation, jobs, queries, user_stats
+from .config import settings
+from .database import get_db
+
+
+class PostRepository(ABC):
+    """
+    Storage of posts behind the /posts handlers, selected by the post_repository setting.
+
+    Reads return schemas.PostOut (the post with its owner, vote count and the
+    viewer's voted_by_me flag when a viewer_id is given), writes return
+    schemas.Post. Writes are staged in the request's transaction, which the
+    handler commits.
+
+    Attributes:
+        transactional (bool): Whether writes join the request's database
+            transaction, which idempotency keys rely on
+    """
+
+    transactional = True
+
+    @abstractmethod
+    def list(self, limit: int, skip: int, search: str = "", viewer_id: Optional[int] = None) -> List[schemas.PostOut]:
+        """
+        Return one page of posts.
+
+        Args:
+            limit (int): The maximum number of posts.
+            skip (int): The number of matching posts to skip.
+            search (str): Only posts whose title contains this text.
+            viewer_id (int): If set, each post says whether this user upvoted it.
+
+        Returns:
+            list: The posts of the page.
+        """
+
+    @abstractmethod
+    def get(self, id: int, viewer_id: Optional[int] = None) -> Optional[schemas.PostOut]:
+        """
+        Return a post, or None if it does not exist.
+        """
+
+    @abstractmethod
+    def get_many(self, ids: List[int], viewer_id: Optional[int] = None) -> List[schemas.PostOut]:
+        """
+        Return the posts of the IDs that exist, in any order.
+        """
+
+    @abstractmethod
+    def owner_of(self, id: int) -> Optional[int]:
+        """
+        Return the owner of a post, or None if it does not exist.
+
+        The post stays locked against concurrent writes until the request's
+        transaction ends, so a following update or delete sees the same post.
+        """
+
+    @abstractmethod
+    def create(self, owner_id: int, data: dict) -> schemas.Post:
+        """
+        Store a new post.
+
+        Args:
+            owner_id (int): The user writing the post.
+            data (dict): The title, content and published fields.
+
+        Returns:
+            schemas.Post: The post with its ID and creation time.
+        """
+
+    @abstractmethod
+    def update(self, id: int, data: dict) -> Optional[schemas.Post]:
+        """
+        Replace the title, content and published fields of a post.
+
+        Returns:
+            schemas.Post: The updated post, or None if it does not exist.
+        """
+
+    @abstractmethod
+    def delete(self, id: int) -> bool:
+        """
+        Delete a post.
+
+        Returns:
+            bool: Whether the post existed.
+        """
+
+
+def load_feed_page(db: Session, limit: int, skip: int, search: str, viewer_id: Optional[int] = None):
+    """
+    Load one GET /posts page, serialized so it can be cached beyond the session.
+    With a viewer_id each post also carries that viewer's voted_by_me flag.
+    """
+    params = {"search": search, "limit": limit, "skip": skip, "viewer_id": viewer_id}
+    statement = queries.FEED_PAGE if viewer_id is None else queries.FEED_PAGE_VOTED
+    if settings.feed_window_days:
+        params["since"] = datetime.now(timezone.utc) - timedelta(days=settings.feed_window_days)
+        statement = queries.RECENT_FEED_PAGE if viewer_id is None else queries.RECENT_FEED_PAGE_VOTED
+    posts = db.execute(statement, params).all()
+    return [schemas.PostOut.from_orm(post) for post in posts]
+
+
+class SQLAlchemyPostRepository(PostRepository):
+    """
+    Posts stored in Postgres, read and written through the request's session.
+
+    Feed pages without a viewer are served from the feed cache. Writes keep the user_stats
+    counters, the caches of every worker and the warm first feed page up to
+    date.
+
+    Attributes:
+        db (Session): The request's session
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def list(self, limit, skip, search="", viewer_id=None):
+        # Pages with a viewer's voted_by_me flags are loaded per request, so each
+        # viewer cannot evict the pages shared by everyone from the cache
+        if viewer_id is not None:
+            return load_feed_page(self.db, limit, skip, search, viewer_id)
+        return cache.feed_cache.get((limit, skip, search),
+                                    partial(load_feed_page, limit=limit, skip=skip, search=search), self.db)
+
+    def get(self, id, viewer_id=None):
+        statement = queries.POST_BY_ID if viewer_id is None else queries.POST_BY_ID_VOTED
+        post = self.db.execute(statement, {"id": id, "viewer_id": viewer_id}).first()
+        return schemas.PostOut.from_orm(post) if post else None
+
+    def get_many(self, ids, viewer_id=None):
+        statement = queries.POSTS_BY_IDS if viewer_id is None else queries.POSTS_BY_IDS_VOTED
+        return [schemas.PostOut.from_orm(post) for post in self.db.execute(statement, {"ids": ids, "viewer_id": viewer_id})]
+
+    def owner_of(self, id):
+        # The row lock keeps new upvotes out until the request commits, so a
+        # delete counts the votes it removes
+        return self.db.query(models.Post.owner_id).filter(models.Post.id == id).with_for_update().scalar()
+
+    def create(self, owner_id, data):
+        post = models.Post(owner_id=owner_id, **data)
+        self.db.add(post)
+        self.db.flush()
+        user_stats.add(self.db, owner_id, posts=1)
+        self._changed(post.id)
+        # Load the server-side defaults
+        self.db.refresh(post)
+        return schemas.Post.from_orm(post)
+
+    def update(self, id, data):
+        post = self.db.query(models.Post).filter(models.Post.id == id).first()
+        if post is None:
+            return None
+        for field, value in data.items():
+            setattr(post, field, value)
+        self.db.flush()
+        self._changed(id)
+        return schemas.Post.from_orm(post)
+
+    def delete(self, id):
+        post_query = self.db.query(models.Post).filter(models.Post.id == id)
+        owner_id = self.owner_of(id)
+        if owner_id is None:
+            return False
+        votes = self.db.query(func.count()).select_from(models.Upvote).filter(models.Upvote.post_id == id).scalar()
+        # Partitioned upvotes have no foreign key to cascade the delete through
+        if settings.posts_partitioning:
+            self.db.query(models.Upvote).filter(models.Upvote.post_id == id).delete(synchronize_session=False)
+        post_query.delete(synchronize_session=False)
+        user_stats.add(self.db, owner_id, posts=-1, votes=-votes)
+        self._changed(id)
+        return True
+
+    def _changed(self, id):
+        invalidation.publish(self.db, "post", id)
+        jobs.enqueue_after_commit(self.db, "feed.warm")
+
+
+class InMemoryPostRepository(PostRepository):
+    """
+    Posts stored in process memory, for load tests and local development.
+
+    Posts are found by ID through a dict. Pages walk a sorted index of
+    (created_at, id) keys, newest first, so a page costs the posts it skips
+    and returns plus the ones filtered out by the title search, not a scan
+    and sort of every post. Nothing is shared between worker processes or
+    kept across restarts, and writes are applied at once rather than at
+    commit.
+
+    There are no users or votes in memory: owners are placeholder profiles
+    built from the user ID, and every post has zero votes. There is no
+    per-owner index either, since no /posts handler lists by owner; owner
+    pages are served by /users/{id}/posts, which reads Postgres.
+    """
+
+    transactional = False
+
+    def __init__(self):
+        self._posts = {}
+        self._by_created = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def list(self, limit, skip, search="", viewer_id=None):
+        with self._lock:
+            matches = (self._posts[id] for _, id in reversed(self._by_created))
+            if search:
+                matches = (post for post in matches if search in post["title"])
+            page = list(itertools.islice(matches, skip, skip + limit))
+        return [self._out(post, viewer_id) for post in page]
+
+    def get(self, id, viewer_id=None):
+        with self._lock:
+            post = self._posts.get(id)
+        return self._out(post, viewer_id) if post is not None else None
+
+    def get_many(self, ids, viewer_id=None):
+        with self._lock:
+            posts = [self._posts[id] for id in ids if id in self._posts]
+        return [self._out(post, viewer_id) for post in posts]
+
+    def owner_of(self, id):
+        with self._lock:
+            post = self._posts.get(id)
+            return post["owner_id"] if post is not None else None
+
+    def create(self, owner_id, data):
+        with self._lock:
+            post = {"id": next(self._ids), "published": True, **data,
+                    "created_at": datetime.now(timezone.utc), "owner_id": owner_id}
+            self._posts[post["id"]] = post
+            bisect.insort(self._by_created, (post["created_at"], post["id"]))
+        return self._post(post)
+
+    def update(self, id, data):
+        with self._lock:
+            post = self._posts.get(id)
+            if post is None:
+                return None
+            # The indexed fields never change, so the index stays valid
+            post = {**post, **data}
+            self._posts[id] = post
+        return self._post(post)
+
+    def delete(self, id):
+        with self._lock:
+            post = self._posts.pop(id, None)
+            if post is None:
+                return False
+            key = (post["created_at"], post["id"])
+            del self._by_created[bisect.bisect_left(self._by_created, key)]
+            return True
+
+    @staticmethod
+    def _post(post):
+        owner = schemas.UserOut(id=post["owner_id"], email=f"user{post['owner_id']}@example.com",
+                                created_at=post["created_at"])
+        return schemas.Post(**post, owner=owner)
+
+    def _out(self, post, viewer_id):
+        return schemas.PostOut(Post=self._post(post), votes=0, voted_by_me=False if viewer_id is not None else None)
+
+
+def create_repository(kind: str, db: Session) -> PostRepository:
+    """
+    Create the repository named by the post_repository setting for one request.
+
+    Args:
+        kind (str): "sqlalchemy" or "memory".
+        db (Session): The request's session, used by the SQLAlchemy backend.
+
+    Returns:
+        PostRepository: The repository.
+
+    Raises:
+        ValueError: If the kind is unknown.
+    """
+    if kind == "sqlalchemy":
+        return SQLAlchemyPostRepository(db)
+    if kind == "memory":
+        return memory_repository
+    raise ValueError(f"unknown post_repository {kind!r}, expected 'sqlalchemy' or 'memory'")
+
+
+# The process-wide store of the memory backend
+memory_repository = InMemoryPostRepository()
+
+# Reject an unknown post_repository setting at import rather than on every request
+create_repository(settings.post_repository, None)
+
+
+def get_repository(db: Session = Depends(get_db)) -> PostRepository:
+    """
+    Dependency returning the selected post repository for the request.
+    """
+    return create_repository(settings.post_repository, db)
@@ -4,7 +4,7 @@ from fastapi.security.oauth2 import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 # Import custom modules
-from .. import database, schemas, models, utils, oauth2
+from .. import database, schemas, models, utils, oauth2, queries
 
 # Create an APIRouter instance for authentication routes
 router = APIRouter(tags=['Authentication'])
@@ -27,8 +27,7 @@ def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db: Session =
     """
 
     # Query the database for the user with the provided email
-    user = db.query(models.User).filter(
-        models.User.email == user_credentials.username).first()
+    user = db.execute(queries.USER_BY_EMAIL, {"email": user_credentials.username}).scalars().first()
 
     # If user not found, raise 403 Forbidden error
     if not user:
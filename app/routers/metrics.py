@@ -0,0 +1,47 @@
+# Import standard library modules
+import hmac
+from typing import Optional
+
+# Import necessary modules from FastAPI
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+# Import custom modules
+from ..config import settings
+from ..metrics import metrics
+
+
+def require_metrics_token(authorization: Optional[str] = Header(None)):
+    """
+    Only let requests carrying the configured metrics token through.
+
+    Args:
+        authorization (Optional[str]): The Authorization header, expected as "Bearer <metrics_token>"
+
+    Raises:
+        HTTPException: 404 if no metrics token is configured, 401 if the header does not match it
+    """
+    if not settings.metrics_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not hmac.compare_digest((authorization or "").encode(), f"Bearer {settings.metrics_token}".encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail="Could not validate credentials",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
+# Create an APIRouter instance for operational metrics, hidden unless a metrics token is set
+router = APIRouter(
+    prefix="/metrics",
+    tags=['Metrics'],
+    dependencies=[Depends(require_metrics_token)]
+)
+
+
+@router.get("/")
+def get_metrics():
+    """
+    Return the metrics collected by this worker process.
+
+    Returns:
+        dict: Counters, gauges and observations keyed by name.
+    """
+    return metrics.snapshot()
@@ -1,10 +1,13 @@
 # Import necessary modules from FastAPI and other dependencies
-from fastapi import FastAPI, Response, status, HTTPException, Depends, APIRouter
+from fastapi import FastAPI, Response, status, HTTPException, Depends, APIRouter, Query, Header
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from sqlalchemy import func
-from .. import models, schemas, oauth2
+from typing import List, Literal, Optional, Union
+from functools import partial
+from .. import schemas, oauth2, cache, invalidation, jobs, idempotency, repository, sideload, suggest
 from ..database import get_db
+from ..config import settings
+from ..repository import PostRepository, get_repository
+from ..singleflight import SingleFlight
 
 # Create an APIRouter instance for post-related routes
 router = APIRouter(
@@ -12,77 +15,168 @@ router = APIRouter(
     tags=['Posts']
 )
 
-@router.get("/", response_model=List[schemas.PostOut])
-def get_posts(db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user), limit: int = 10, skip: int = 0, search: Optional[str] = ""):
+# Coalesces concurrent GET /posts/{id} requests for the same post into one query
+post_flight = SingleFlight("post_flight")
+
+def warm_first_page(id: Optional[int] = None):
+    """
+    Reload this worker's cached first feed page in the background.
+    """
+    cache.feed_cache.warm((10, 0, ""), partial(repository.load_feed_page, limit=10, skip=0, search=""))
+
+# Every worker warms its own cache, so readers of all of them find the page loaded
+invalidation.subscribe("feed.warm", warm_first_page)
+
+@jobs.handler("feed.warm")
+def warm_feed(db: Session):
+    """
+    Ask every worker to reload its first feed page after a burst of writes.
+    The event is sent when the job commits, after the writes it follows.
+    """
+    invalidation.publish(db, "feed.warm")
+
+def current_user_id(token: str = Depends(oauth2.oauth2_scheme), db: Session = Depends(get_db),
+                    posts: PostRepository = Depends(get_repository)):
+    """
+    Get the ID of the authenticated user of a /posts request.
+
+    With a database-backed repository the user is loaded, as by
+    oauth2.get_current_user, so tokens of deleted users are rejected. A
+    repository outside the database runs without users, so the token alone
+    is checked.
+
+    Raises:
+        HTTPException: 401 if the credentials are invalid or the user no longer exists.
+    """
+    if not posts.transactional:
+        return oauth2.get_current_user_id(token)
+    user = oauth2.get_current_user(token, db)
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail="Could not validate credentials",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return user.id
+
+@router.get("/", response_model=Union[List[schemas.PostOut], schemas.PostListCompact])
+def get_posts(response: Response, posts: PostRepository = Depends(get_repository), user_id: int = Depends(current_user_id),
+              limit: int = 10, skip: int = 0, search: Optional[str] = "", voted_by_me: bool = False,
+              format: Literal["nested", "compact"] = "nested", accept: Optional[str] = Header(None)):
     """
     Retrieve a list of posts with vote counts.
     Supports pagination and search functionality.
+    With voted_by_me=true each post also says whether the current user upvoted it.
+    With format=compact, or an Accept header of application/vnd.posts.compact+json,
+    owners are sent once under included.users instead of inside every post.
+    In Postgres, pages are served from the feed cache and invalidated by every post or vote write.
     """
-    posts = db.query(models.Post, func.count(models.Vote.post_id).label("votes")).join(
-        models.Vote, models.Vote.post_id == models.Post.id, isouter=True).group_by(models.Post.id).filter(models.Post.title.contains(search)).limit(limit).offset(skip).all()
-    return posts
+    page = posts.list(limit, skip, search, user_id if voted_by_me else None)
+    if sideload.wants_compact(format, accept, response):
+        return sideload.compact_response(sideload.compact(page), accept)
+    return page
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.Post)
-def create_posts(post: schemas.PostCreate, db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
+def create_posts(post: schemas.PostCreate, db: Session = Depends(get_db), posts: PostRepository = Depends(get_repository),
+                 user_id: int = Depends(current_user_id), idempotency_key: Optional[str] = Header(None)):
     """
     Create a new post for the authenticated user.
+    A retry with the same Idempotency-Key header replays the first response
+    instead of creating another post. Keys are only honoured by repositories
+    whose writes join the database transaction.
     """
-    new_post = models.Post(owner_id=current_user.id, **post.dict())
-    db.add(new_post)
+    idempotent = idempotency_key and posts.transactional
+    if idempotent:
+        request_hash = idempotency.fingerprint("POST /posts", post.dict())
+        replay = idempotency.begin(db, user_id, idempotency_key, request_hash)
+        if replay is not None:
+            return replay
+
+    new_post = posts.create(user_id, post.dict())
+    if idempotent:
+        idempotency.finish(db, user_id, idempotency_key, status.HTTP_201_CREATED, new_post)
+
     db.commit()
-    db.refresh(new_post)
     return new_post
 
+@router.get("/suggest", response_model=List[schemas.PostSuggestion])
+def suggest_posts(prefix: str, limit: int = Query(10, ge=1, le=50), user_id: int = Depends(oauth2.get_current_user_id)):
+    """
+    Suggest published post titles with a word starting with the prefix, most voted first.
+    Served from the in-memory title index and authenticated from the token alone,
+    so a keystroke costs no database query.
+    """
+    return suggest.index.suggest(prefix, limit)
+
+@router.get("/batch", response_model=schemas.PostBatch)
+def get_posts_batch(ids: List[int] = Query(...), posts: PostRepository = Depends(get_repository),
+                    user_id: int = Depends(current_user_id), voted_by_me: bool = False):
+    """
+    Retrieve many posts by ID, including vote counts, in a single query.
+    Posts are returned in the order their IDs were requested, and IDs
+    that do not exist are listed in `missing`.
+    With voted_by_me=true each post also says whether the current user upvoted it.
+    """
+    # Drop repeated IDs while keeping the order they were requested in
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > settings.post_batch_max_ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"at most {settings.post_batch_max_ids} ids can be requested at once")
+
+    found = {post.Post.id: post for post in posts.get_many(ids, user_id if voted_by_me else None)}
+    return {"posts": [found[id] for id in ids if id in found],
+            "missing": [id for id in ids if id not in found]}
+
 @router.get("/{id}", response_model=schemas.PostOut)
-def get_post(id: int, db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
+def get_post(id: int, posts: PostRepository = Depends(get_repository), user_id: int = Depends(current_user_id),
+             voted_by_me: bool = False):
     """
     Retrieve a specific post by its ID, including vote count.
+    With voted_by_me=true the post also says whether the current user upvoted it.
+    Concurrent requests for the same post share one query; each caller is
+    still authenticated on its own.
     """
-    post = db.query(models.Post, func.count(models.Vote.post_id).label("votes")).join(
-        models.Vote, models.Vote.post_id == models.Post.id, isouter=True).group_by(models.Post.id).filter(models.Post.id == id).first()
+    viewer_id = user_id if voted_by_me else None
+    post = post_flight.do((id, viewer_id), partial(posts.get, id, viewer_id))
 
     if not post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail=f"post with id: {id} was not found")
     return post
 
-@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_post(id: int, db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
+def check_owner(id: int, posts: PostRepository, user_id: int):
     """
-    Delete a post. Only the owner of the post can delete it.
+    Make sure a post exists and belongs to the user about to change it.
+
+    Raises:
+        HTTPException: 404 if the post does not exist, 403 if the user does not own it.
     """
-    post_query = db.query(models.Post).filter(models.Post.id == id)
-    post = post_query.first()
+    owner_id = posts.owner_of(id)
 
-    if post == None:
+    if owner_id is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail=f"post with id: {id} does not exist")
 
-    if post.owner_id != current_user.id:
+    if owner_id != user_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                             detail="Not authorized to perform requested action")
 
-    post_query.delete(synchronize_session=False)
+@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_post(id: int, db: Session = Depends(get_db), posts: PostRepository = Depends(get_repository),
+                user_id: int = Depends(current_user_id)):
+    """
+    Delete a post. Only the owner of the post can delete it.
+    """
+    check_owner(id, posts, user_id)
+    posts.delete(id)
     db.commit()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 @router.put("/{id}", response_model=schemas.Post)
-def update_post(id: int, updated_post: schemas.PostCreate, db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
+def update_post(id: int, updated_post: schemas.PostCreate, db: Session = Depends(get_db), posts: PostRepository = Depends(get_repository),
+                user_id: int = Depends(current_user_id)):
     """
-
     Update a post. Only the owner of the post can update it.
     """
-    post_query = db.query(models.Post).filter(models.Post.id == id)
-    post = post_query.first()
-
-    if post == None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                            detail=f"post with id: {id} does not exist")
-
-    if post.owner_id != current_user.id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
-                            detail="Not authorized to perform requested action")
-
-    post_query.update(updated_post.dict(), synchronize_session=False)
+    check_owner(id, posts, user_id)
+    post = posts.update(id, updated_post.dict())
     db.commit()
-    return post_query.first()
+    return post
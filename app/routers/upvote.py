@@ -1,7 +1,8 @@
 # Import necessary modules from FastAPI and other dependencies
-from fastapi import FastAPI, Response, status, HTTPException, Depends, APIRouter
+from fastapi import FastAPI, Response, status, HTTPException, Depends, APIRouter, Header
+from typing import Optional
 from sqlalchemy.orm import Session
-from .. import schemas, database, models, oauth2
+from .. import schemas, database, models, oauth2, invalidation, jobs, idempotency, user_stats
 
 # Create an APIRouter instance for upvote-related routes
 router = APIRouter(
@@ -12,7 +13,8 @@ router = APIRouter(
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
 def Upvote(Upvote: schemas.Upvote, db: Session = Depends(database.get_db),
-           current_user: int = Depends(oauth2.get_current_user)):
+           current_user: int = Depends(oauth2.get_current_user),
+           idempotency_key: Optional[str] = Header(None)):
     """
 
     Handle upvoting and removing upvotes for posts.
@@ -24,6 +26,7 @@ def Upvote(Upvote: schemas.Upvote, db: Session = Depends(database.get_db),
         Upvote (schemas.Upvote): The upvote data (post_id and direction)
         db (Session): The database session
         current_user (int): The authenticated user's ID
+        idempotency_key (Optional[str]): Makes retries replay the first response
 
     Returns:
         dict: A message indicating the result of the operation
@@ -32,8 +35,16 @@ def Upvote(Upvote: schemas.Upvote, db: Session = Depends(database.get_db),
         HTTPException: For various error conditions (404 Not Found, 409 Conflict)
     """
 
-    # Check if the post exists
-    post = db.query(models.Post).filter(models.Post.id == Upvote.post_id).first()
+    # A retry of a request that already succeeded gets the same response back
+    if idempotency_key:
+        request_hash = idempotency.fingerprint("POST /Upvote", Upvote.dict())
+        replay = idempotency.begin(db, current_user.id, idempotency_key, request_hash)
+        if replay is not None:
+            return replay
+
+    # Check if the post exists, and keep it from being deleted until this vote
+    # and its owner's counter commit
+    post = db.query(models.Post).filter(models.Post.id == Upvote.post_id).with_for_update(read=True, key_share=True).first()
     if not post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail=f"Post with id: {Upvote.post_id} does not exist")
@@ -54,8 +65,15 @@ def Upvote(Upvote: schemas.Upvote, db: Session = Depends(database.get_db),
         # Create new upvote
         new_vote = models.Upvote(post_id=Upvote.post_id, user_id=current_user.id)
         db.add(new_vote)
+        db.flush()
+        user_stats.add(db, post.owner_id, votes=1)
+        invalidation.publish(db, "upvote", Upvote.post_id)
+        jobs.enqueue_after_commit(db, "feed.warm")
+        result = {"message": "successfully added vote"}
+        if idempotency_key:
+            idempotency.finish(db, current_user.id, idempotency_key, status.HTTP_201_CREATED, result)
         db.commit()
-        return {"message": "successfully added vote"}
+        return result
     else:
         # User is trying to remove their upvote
         if not found_vote:
@@ -65,6 +83,12 @@ def Upvote(Upvote: schemas.Upvote, db: Session = Depends(database.get_db),
 
         # Remove the upvote
         upvote_query.delete(synchronize_session=False)
+        user_stats.add(db, post.owner_id, votes=-1)
+        invalidation.publish(db, "upvote", Upvote.post_id)
+        jobs.enqueue_after_commit(db, "feed.warm")
+        result = {"message": "successfully deleted upvote"}
+        if idempotency_key:
+            idempotency.finish(db, current_user.id, idempotency_key, status.HTTP_201_CREATED, result)
         db.commit()
 
-        return {"message": "successfully deleted upvote"}
+        return result
@@ -1,7 +1,10 @@
 # Import necessary modules from FastAPI and other dependencies
-from fastapi import FastAPI, Response, status, HTTPException, Depends, APIRouter
+from fastapi import FastAPI, Response, status, HTTPException, Depends, APIRouter, Query, Header
 from sqlalchemy.orm import Session
-from .. import models, schemas, utils
+from sqlalchemy import func, tuple_, exists
+from sqlalchemy.orm import aliased
+from typing import Literal, Optional, Union
+from .. import models, schemas, utils, oauth2, invalidation, sideload, user_stats
 from ..database import get_db
 
 # Create an APIRouter instance for user-related routes
@@ -37,12 +40,141 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     # Create a new User model instance and add it to the database
     new_user = models.User(**user.dict())
     db.add(new_user)
+    db.flush()
+    invalidation.publish(db, "user", new_user.id)
     db.commit()
     db.refresh(new_user)
 
     return new_user
 
 
+def get_owner_posts_page(db: Session, owner_id: int, limit: int, cursor: Optional[str], viewer_id: Optional[int] = None):
+    """
+    Fetch one page of a user's posts, newest first, with vote counts.
+
+    Pagination is keyset based on (created_at, id) so each page is a range
+    scan of the (owner_id, created_at) index instead of an OFFSET skip.
+
+    Args:
+        db (Session): The database session
+        owner_id (int): The ID of the user whose posts are listed
+        limit (int): The maximum number of posts in the page
+        cursor (Optional[str]): The next_cursor of the previous page, if any
+        viewer_id (Optional[int]): If set, each post says whether this user upvoted it
+
+    Returns:
+        dict: The page items and the cursor of the following page
+
+    Raises:
+        HTTPException: If the cursor is malformed
+    """
+    query = db.query(models.Post, func.count(models.Upvote.post_id).label("votes")).join(
+        models.Upvote, models.Upvote.post_id == models.Post.id, isouter=True).filter(
+        models.Post.owner_id == owner_id)
+
+    if viewer_id is not None:
+        voter = aliased(models.Upvote)
+        query = query.add_columns(exists().where(
+            voter.post_id == models.Post.id, voter.user_id == viewer_id).label("voted_by_me"))
+
+    if cursor:
+        try:
+            created_at, last_id = utils.decode_cursor(cursor)
+        except ValueError as error:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+        query = query.filter(tuple_(models.Post.created_at, models.Post.id) < (created_at, last_id))
+
+    # Fetch one extra row to find out whether a following page exists
+    rows = query.group_by(models.Post.id, models.Post.created_at).order_by(
+        models.Post.created_at.desc(), models.Post.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1].Post
+        next_cursor = utils.encode_cursor(last.created_at, last.id)
+
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+@router.get('/me/posts', response_model=Union[schemas.PostPage, schemas.PostListCompact])
+def get_my_posts(response: Response, db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user),
+                 limit: int = Query(10, ge=1, le=100), cursor: Optional[str] = None, voted_by_me: bool = False,
+                 format: Literal["nested", "compact"] = "nested", accept: Optional[str] = Header(None)):
+    """
+    Retrieve the authenticated user's posts, newest first, with vote counts.
+
+    Args:
+        db (Session): The database session
+        current_user (models.User): The authenticated user
+        limit (int): The maximum number of posts in the page
+        cursor (Optional[str]): The next_cursor of the previous page, if any
+        voted_by_me (bool): Whether each post says if the current user upvoted it
+        format (str): "compact" to send the owner once instead of inside every post
+        accept (Optional[str]): An Accept header of application/vnd.posts.compact+json also selects "compact"
+
+    Returns:
+        dict: The page items and the cursor of the following page
+    """
+    page = get_owner_posts_page(db, current_user.id, limit, cursor, current_user.id if voted_by_me else None)
+    if sideload.wants_compact(format, accept, response):
+        return sideload.compact_response(sideload.compact(page["items"], page["next_cursor"]), accept)
+    return page
+
+
+@router.get('/{id}/posts', response_model=Union[schemas.PostPage, schemas.PostListCompact])
+def get_user_posts(id: int, response: Response, db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user),
+                   limit: int = Query(10, ge=1, le=100), cursor: Optional[str] = None, voted_by_me: bool = False,
+                   format: Literal["nested", "compact"] = "nested", accept: Optional[str] = Header(None)):
+    """
+    Retrieve a user's posts, newest first, with vote counts.
+
+    Args:
+        id (int): The ID of the user whose posts are listed
+        db (Session): The database session
+        current_user (models.User): The authenticated user
+        limit (int): The maximum number of posts in the page
+        cursor (Optional[str]): The next_cursor of the previous page, if any
+        voted_by_me (bool): Whether each post says if the current user upvoted it
+        format (str): "compact" to send the owner once instead of inside every post
+        accept (Optional[str]): An Accept header of application/vnd.posts.compact+json also selects "compact"
+
+    Returns:
+        dict: The page items and the cursor of the following page
+
+    Raises:
+        HTTPException: If the user with the given ID is not found
+    """
+    page = get_owner_posts_page(db, id, limit, cursor, current_user.id if voted_by_me else None)
+
+    # Only an empty page needs the extra lookup to tell "no posts" from "no user"
+    if not page["items"] and not db.query(models.User.id).filter(models.User.id == id).first():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"User with id: {id} does not exist")
+
+    if sideload.wants_compact(format, accept, response):
+        return sideload.compact_response(sideload.compact(page["items"], page["next_cursor"]), accept)
+    return page
+
+
+@router.get('/{id}/stats', response_model=schemas.UserStats)
+def get_user_stats(id: int, db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
+    """
+    Retrieve the number of posts a user wrote and of votes their posts received.
+
+    The counters are maintained by the post and upvote endpoints, so this
+    reads one row rather than counting posts and upvotes.
+
+    Raises:
+        HTTPException: If the user with the given ID is not found
+    """
+    stats = user_stats.get(db, id)
+    if stats is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"User with id: {id} does not exist")
+    return stats
+
+
 @router.get('/{id}', response_model=schemas.UserOut)
 def get_user(id: int, db: Session = Depends(get_db)):
     """
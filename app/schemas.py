@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 from pydantic.types import conint
 
 class PostBase(BaseModel):
@@ -27,6 +27,19 @@ class UserOut(BaseModel):
 
     class Config:
         orm_mode = True  # Allows the model to read data from ORM objects
+        from_attributes = True  # Same setting under its pydantic 2 name
+
+class UserStats(BaseModel):
+    """
+    Model for the aggregate counters of a user's profile.
+    """
+    user_id: int
+    posts_written: int
+    votes_received: int
+
+    class Config:
+        orm_mode = True  # Allows the model to read data from ORM objects
+        from_attributes = True  # Same setting under its pydantic 2 name
 
 class Post(PostBase):
     """
@@ -39,16 +52,72 @@ class Post(PostBase):
 
     class Config:
         orm_mode = True
+        from_attributes = True
 
 class PostOut(BaseModel):
     """
     Model for post output, including vote count.
+    voted_by_me: whether the requesting user upvoted the post, only set when requested
     """
     Post: Post
     votes: int
+    voted_by_me: Optional[bool] = None
 
     class Config:
         orm_mode = True
+        from_attributes = True
+
+class PostCompact(PostBase):
+    """
+    Model for a post in the compact list format.
+    The owner is not embedded; it is found under included.users by owner_id.
+    """
+    id: int
+    created_at: datetime
+    owner_id: int
+    votes: int
+    voted_by_me: Optional[bool] = None
+
+class IncludedUsers(BaseModel):
+    """
+    Model for the entities side-loaded once for a whole compact list.
+    users: the owners of the listed posts, keyed by user ID
+    """
+    users: Dict[int, UserOut]
+
+class PostListCompact(BaseModel):
+    """
+    Model for a list of posts in the compact format, where each owner is sent once.
+    next_cursor: set for keyset-paginated lists when a following page exists
+    """
+    posts: List[PostCompact]
+    included: IncludedUsers
+    next_cursor: Optional[str] = None
+
+class PostPage(BaseModel):
+    """
+    Model for a keyset-paginated page of posts.
+    next_cursor: opaque cursor for the following page, None on the last page
+    """
+    items: List[PostOut]
+    next_cursor: Optional[str] = None
+
+class PostBatch(BaseModel):
+    """
+    Model for a batch of posts fetched by ID.
+    posts: the posts found, in the order their IDs were requested
+    missing: the requested IDs that do not exist
+    """
+    posts: List[PostOut]
+    missing: List[int]
+
+class PostSuggestion(BaseModel):
+    """
+    Model for a typeahead suggestion of a post title.
+    """
+    id: int
+    title: str
+    votes: int
 
 class UserCreate(BaseModel):
     """
@@ -76,7 +145,7 @@ class TokenData(BaseModel):
     Model for token payload data.
 
     """
-    id: Optional[str] = None
+    id: Optional[int] = None
 
 class Upvote(BaseModel):
     """
@@ -0,0 +1,72 @@
+# Import necessary modules from FastAPI
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+# Import local modules
+from . import schemas
+
+# Media type that selects the compact format through the Accept header
+COMPACT_MEDIA_TYPE = "application/vnd.posts.compact+json"
+
+
+def wants_compact(format: str, accept: str, response: Response):
+    """
+    Decide whether a post list is sent in the compact format.
+
+    Args:
+        format (str): The format query parameter, "nested" or "compact".
+        accept (str): The Accept header, if any.
+        response (Response): The response, told that the format depends on Accept.
+
+    Returns:
+        bool: True for the compact format.
+    """
+    response.headers["Vary"] = "Accept"
+    return format == "compact" or COMPACT_MEDIA_TYPE in (accept or "")
+
+
+def compact_response(page: schemas.PostListCompact, accept: str):
+    """
+    Send a compact page with the media type the client asked for.
+
+    A page requested through the Accept header is labelled with the compact
+    media type; one requested with format=compact stays application/json.
+
+    Args:
+        page (schemas.PostListCompact): The page returned by compact().
+        accept (str): The Accept header, if any.
+
+    Returns:
+        The page, or a response carrying it with the compact media type.
+    """
+    if COMPACT_MEDIA_TYPE not in (accept or ""):
+        return page
+    # A returned response does not get the headers set on the injected one
+    return JSONResponse(jsonable_encoder(page), media_type=COMPACT_MEDIA_TYPE, headers={"Vary": "Accept"})
+
+
+def compact(posts, next_cursor: str = None):
+    """
+    Convert nested posts into the compact format, side-loading each owner once.
+
+    Args:
+        posts (list): Rows or schemas.PostOut objects with Post, votes and voted_by_me.
+        next_cursor (str): The cursor of the following page, if any.
+
+    Returns:
+        schemas.PostListCompact: The posts referencing their owners by ID.
+    """
+    users = {}
+    items = []
+    for post in posts:
+        owner = post.Post.owner
+        if owner.id not in users:
+            users[owner.id] = schemas.UserOut.from_orm(owner)
+        items.append(schemas.PostCompact(
+            id=post.Post.id, title=post.Post.title, content=post.Post.content,
+            published=post.Post.published, created_at=post.Post.created_at,
+            owner_id=post.Post.owner_id, votes=post.votes,
+            voted_by_me=getattr(post, "voted_by_me", None)))
+    return schemas.PostListCompact(posts=items, included=schemas.IncludedUsers(users=users),
+                                   next_cursor=next_cursor)
@@ -0,0 +1,79 @@
+# Import standard library modules
+import threading
+
+# Import local modules
+from .metrics import metrics
+
+
+class _Call:
+    """
+    A call in progress that concurrent callers with the same key wait on.
+    """
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one execution.
+
+    While a call for a key is running, other callers with the same key wait
+    for it and receive its result, or its exception, instead of running the
+    function again. Nothing is kept once the call finishes, so this never
+    serves an outdated result; it only removes duplicate concurrent work.
+
+    The calls, executions and coalesced counters are recorded under the
+    group's name, so executions / calls is the fraction of calls that did
+    the work themselves.
+
+    Attributes:
+        name (str): Prefix of this group's counters in the metrics registry
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """
+        Run fn for the key, or wait for the identical call already running.
+
+        Args:
+            key (hashable): Identifies identical calls, e.g. route and parameters.
+            fn (callable): Takes no arguments and returns the shared result.
+
+        Returns:
+            The result of the single execution of fn.
+
+        Raises:
+            Exception: Whatever that execution of fn raised.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        metrics.inc(f"{self.name}.calls")
+
+        if leader:
+            metrics.inc(f"{self.name}.executions")
+            try:
+                call.value = fn()
+            except Exception as error:
+                call.error = error
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.done.set()
+        else:
+            metrics.inc(f"{self.name}.coalesced")
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.value
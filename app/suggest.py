@@ -0,0 +1,275 @@
+# Import standard library modules
+import bisect
+import logging
+import threading
+
+# Import SQLAlchemy modules
+from sqlalchemy import func, select
+
+# Import local modules
+from . import models, invalidation
+from .config import settings
+from .database import BackgroundSessionLocal
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Only the first words of a title can start a match
+MAX_WORDS_PER_TITLE = 8
+
+# Longest prefix with its own ranked bucket; longer prefixes filter that bucket
+MAX_PREFIX_LENGTH = 6
+
+
+def normalize(text: str):
+    """
+    Normalize text for prefix matching: case-insensitive, single spaces.
+
+    Args:
+        text (str): A title or a typed prefix.
+
+    Returns:
+        str: The normalized text.
+    """
+    return " ".join(text.casefold().split())
+
+
+class PrefixIndex:
+    """
+    In-memory prefix index of published post titles, ranked by votes.
+
+    Every word start of a title is a key, so "big" finds "Hello big world".
+    Each prefix of up to MAX_PREFIX_LENGTH characters of a key has a bucket
+    holding its posts as (-votes, post_id), sorted. A lookup of a short
+    prefix returns the head of its bucket, which is the exact top by votes.
+    A longer prefix walks the bucket of its first MAX_PREFIX_LENGTH
+    characters in vote order and keeps the posts that match the whole
+    prefix. It examines at most max_scan posts, so it can return fewer
+    suggestions, but never lower-voted ones ahead of higher-voted ones.
+
+    The buckets hold at most max_entries (-votes, post_id) pairs in total,
+    about 64 bytes each; past that the least voted posts are dropped.
+
+    Post and vote events are batched: the posts changed within
+    refresh_delay seconds are reloaded with one query.
+
+    Attributes:
+        max_entries (int): Maximum number of bucket entries held
+        max_scan (int): Maximum number of posts examined per long-prefix lookup
+        session_factory (callable): Creates the sessions used to (re)load posts
+        refresh_delay (float): Seconds change events are collected before reloading
+    """
+
+    def __init__(self, max_entries: int, max_scan: int, session_factory, refresh_delay: float = 1.0):
+        self.max_entries = max_entries
+        self.max_scan = max_scan
+        self.session_factory = session_factory
+        self.refresh_delay = refresh_delay
+        self._posts = {}
+        self._buckets = {}
+        self._size = 0
+        self._pending = set()
+        self._pending_all = False
+        self._flush_scheduled = False
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def suggest(self, prefix: str, limit: int):
+        """
+        Return the most voted posts whose title has a word starting with the prefix.
+
+        Args:
+            prefix (str): The text typed so far.
+            limit (int): The maximum number of suggestions.
+
+        Returns:
+            list: Dicts with id, title and votes, most voted first.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            bucket = self._buckets.get(prefix[:MAX_PREFIX_LENGTH], ())
+            if len(prefix) <= MAX_PREFIX_LENGTH:
+                posts = [self._posts[post_id] for _, post_id in bucket[:limit]]
+            else:
+                posts = []
+                for _, post_id in bucket[:self.max_scan]:
+                    post = self._posts[post_id]
+                    if any(key.startswith(prefix) for key in post["keys"]):
+                        posts.append(post)
+                        if len(posts) == limit:
+                            break
+            return [{"id": post["id"], "title": post["title"], "votes": post["votes"]} for post in posts]
+
+    def upsert(self, post_id: int, title: str, votes: int, published: bool):
+        """
+        Add, update or, for unpublished posts, remove one post.
+
+        Args:
+            post_id (int): The post ID.
+            title (str): The post title.
+            votes (int): The post's vote count.
+            published (bool): Whether the post is published.
+        """
+        with self._lock:
+            self._remove(post_id)
+            if published:
+                self._insert(self._entry(post_id, title, votes))
+                self._trim()
+
+    def remove(self, post_id: int):
+        """
+        Remove one post.
+
+        Args:
+            post_id (int): The post ID.
+        """
+        with self._lock:
+            self._remove(post_id)
+
+    def rebuild(self):
+        """
+        Replace the whole index with the most voted published posts.
+
+        Posts are streamed most voted first and taken until the next one
+        would exceed max_entries, so the new index never holds more entries
+        than that, even while it is being built.
+        """
+        votes = func.count(models.Upvote.post_id)
+        statement = select(models.Post.id, models.Post.title, votes).outerjoin(
+            models.Upvote, models.Upvote.post_id == models.Post.id).where(
+            models.Post.published.is_(True)).group_by(models.Post.id, models.Post.created_at).order_by(
+            votes.desc(), models.Post.id).execution_options(yield_per=1000)
+
+        posts = {}
+        entries = 0
+        db = self.session_factory()
+        try:
+            for post_id, title, post_votes in db.execute(statement):
+                post = self._entry(post_id, title, post_votes)
+                if entries + len(post["prefixes"]) > self.max_entries:
+                    break
+                posts[post_id] = post
+                entries += len(post["prefixes"])
+        finally:
+            db.close()
+
+        with self._lock:
+            self._load(posts)
+        metrics.set("suggest.index_entries", self._size)
+
+    def refresh(self, post_id: int = None):
+        """
+        Schedule a reload of one post from the database, or of the whole index.
+
+        Used as the invalidation handler for post and upvote events, so the
+        index follows writes made by this worker and by the others. Events
+        arriving within refresh_delay seconds share one query, so a burst of
+        votes costs each worker one SELECT rather than one per vote.
+
+        Args:
+            post_id (int): The changed post, or None to rebuild everything.
+        """
+        with self._lock:
+            if post_id is None:
+                self._pending_all = True
+            else:
+                self._pending.add(post_id)
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        timer = threading.Timer(self.refresh_delay, self._flush)
+        timer.daemon = True
+        timer.start()
+
+    def _flush(self):
+        with self._lock:
+            post_ids, self._pending = self._pending, set()
+            rebuild, self._pending_all = self._pending_all, False
+            self._flush_scheduled = False
+        try:
+            if rebuild:
+                self.rebuild()
+                return
+            statement = select(models.Post.id, models.Post.title, models.Post.published,
+                               func.count(models.Upvote.post_id).label("votes")).outerjoin(
+                models.Upvote, models.Upvote.post_id == models.Post.id).where(
+                models.Post.id.in_(post_ids)).group_by(models.Post.id, models.Post.created_at)
+            db = self.session_factory()
+            try:
+                rows = db.execute(statement).all()
+            finally:
+                db.close()
+            for row in rows:
+                self.upsert(row.id, row.title, row.votes, row.published)
+            # Posts that are gone were deleted
+            for post_id in post_ids - {row.id for row in rows}:
+                self.remove(post_id)
+            metrics.inc("suggest.refreshed_posts", len(post_ids))
+            metrics.set("suggest.index_entries", self._size)
+        except Exception:
+            logger.exception("refreshing the suggestion index failed for posts %s", sorted(post_ids))
+
+    @staticmethod
+    def _title_keys(title: str):
+        words = normalize(title).split(" ")[:MAX_WORDS_PER_TITLE]
+        return [" ".join(words[n:]) for n in range(len(words)) if words[n]]
+
+    def _entry(self, post_id, title, votes):
+        keys = self._title_keys(title)
+        prefixes = {key[:length] for key in keys for length in range(1, min(len(key), MAX_PREFIX_LENGTH) + 1)}
+        return {"id": post_id, "title": title, "votes": votes, "keys": keys, "prefixes": prefixes}
+
+    def _insert(self, post):
+        self._posts[post["id"]] = post
+        item = (-post["votes"], post["id"])
+        for prefix in post["prefixes"]:
+            bisect.insort(self._buckets.setdefault(prefix, []), item)
+        self._size += len(post["prefixes"])
+
+    def _remove(self, post_id):
+        post = self._posts.pop(post_id, None)
+        if post is None:
+            return
+        item = (-post["votes"], post_id)
+        for prefix in post["prefixes"]:
+            bucket = self._buckets[prefix]
+            del bucket[bisect.bisect_left(bucket, item)]
+            if not bucket:
+                del self._buckets[prefix]
+        self._size -= len(post["prefixes"])
+
+    def _load(self, posts):
+        buckets = {}
+        for post in posts.values():
+            item = (-post["votes"], post["id"])
+            for prefix in post["prefixes"]:
+                buckets.setdefault(prefix, []).append(item)
+        for bucket in buckets.values():
+            bucket.sort()
+        self._posts = posts
+        self._buckets = buckets
+        self._size = sum(len(post["prefixes"]) for post in posts.values())
+
+    def _trim(self):
+        # Trimming rebuilds every bucket, so let the index overshoot by 10% before doing it
+        if self._size <= self.max_entries * 1.1:
+            return
+        kept = 0
+        posts = {}
+        for post in sorted(self._posts.values(), key=lambda post: post["votes"], reverse=True):
+            if kept + len(post["prefixes"]) > self.max_entries:
+                break
+            kept += len(post["prefixes"])
+            posts[post["id"]] = post
+        self._load(posts)
+
+
+# Index built by the application lifespan and kept current by change events
+index = PrefixIndex(settings.suggest_max_entries, settings.suggest_max_scan, BackgroundSessionLocal,
+                    settings.suggest_refresh_delay_seconds)
+invalidation.subscribe("post", index.refresh)
+invalidation.subscribe("upvote", index.refresh)
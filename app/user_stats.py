@@ -0,0 +1,145 @@
+# Import SQLAlchemy modules
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+# Import local modules
+from . import jobs, models
+from .config import settings
+from .metrics import metrics
+
+# Adds to a user's counters. The row stays locked until the caller's
+# transaction ends, which serializes the counter updates of one user without
+# losing any of them.
+_ADD = text("""
+    UPDATE user_stats
+    SET posts_written = posts_written + :posts, votes_received = votes_received + :votes
+    WHERE user_id = :user_id
+""")
+
+# A user's counters computed from posts and upvotes
+_COUNTS = """
+    SELECT (SELECT count(*) FROM posts WHERE owner_id = :user_id),
+           (SELECT count(*) FROM upvotes JOIN posts ON posts.id = upvotes.post_id
+            WHERE posts.owner_id = :user_id)
+"""
+
+# Creates the row of a user who has none yet, e.g. one who wrote posts before
+# user_stats existed. The counts already include the caller's write; if another
+# transaction created the row meanwhile, the change is added to it instead.
+_SEED = text(f"""
+    INSERT INTO user_stats (user_id, posts_written, votes_received)
+    SELECT :user_id, counts.* FROM ({_COUNTS}) AS counts
+    ON CONFLICT (user_id) DO UPDATE
+        SET posts_written = user_stats.posts_written + :posts,
+            votes_received = user_stats.votes_received + :votes
+""")
+
+# Gives every user of a range a row, so that _LOCK_BATCH covers all of them
+_CREATE_BATCH = text("""
+    INSERT INTO user_stats (user_id)
+    SELECT id FROM users WHERE id >= :first AND id < :last
+    ON CONFLICT (user_id) DO NOTHING
+""")
+
+# Waits for the writers currently updating counters in the batch, and keeps
+# new ones out until the batch commits
+_LOCK_BATCH = text("""
+    SELECT user_id FROM user_stats
+    WHERE user_id >= :first AND user_id < :last
+    ORDER BY user_id
+    FOR UPDATE
+""")
+
+# Recounts a range of users from posts and upvotes and overwrites the counters
+# that drifted. Run after _LOCK_BATCH in the same transaction, its snapshot
+# includes every write whose counter update already committed.
+_RECONCILE_BATCH = text("""
+    INSERT INTO user_stats (user_id, posts_written, votes_received)
+    SELECT users.id, COALESCE(written.count, 0), COALESCE(received.count, 0)
+    FROM users
+    LEFT JOIN (
+        SELECT owner_id, count(*) AS count FROM posts
+        WHERE owner_id >= :first AND owner_id < :last
+        GROUP BY owner_id
+    ) AS written ON written.owner_id = users.id
+    LEFT JOIN (
+        SELECT posts.owner_id, count(*) AS count FROM upvotes
+        JOIN posts ON posts.id = upvotes.post_id
+        WHERE posts.owner_id >= :first AND posts.owner_id < :last
+        GROUP BY posts.owner_id
+    ) AS received ON received.owner_id = users.id
+    WHERE users.id >= :first AND users.id < :last
+    ON CONFLICT (user_id) DO UPDATE
+        SET posts_written = EXCLUDED.posts_written,
+            votes_received = EXCLUDED.votes_received
+        WHERE (user_stats.posts_written, user_stats.votes_received)
+              IS DISTINCT FROM (EXCLUDED.posts_written, EXCLUDED.votes_received)
+""")
+
+
+def add(db: Session, user_id: int, posts: int = 0, votes: int = 0):
+    """
+    Add to a user's counters as part of the session's current transaction.
+
+    Must run after the counted write is flushed: a user without a row yet gets
+    one counted from posts and upvotes, which has to include that write.
+
+    Args:
+        db (Session): The session performing the counted write.
+        user_id (int): The user whose counters change.
+        posts (int): Change of the number of posts written.
+        votes (int): Change of the number of votes received.
+    """
+    params = {"user_id": user_id, "posts": posts, "votes": votes}
+    if db.execute(_ADD, params).rowcount == 0:
+        db.execute(_SEED, params)
+
+
+def get(db: Session, user_id: int):
+    """
+    Read a user's counters.
+
+    Args:
+        db (Session): The request's session.
+        user_id (int): The user.
+
+    Returns:
+        dict: user_id, posts_written and votes_received, or None if the user
+        does not exist.
+    """
+    row = db.query(models.UserStats).filter(models.UserStats.user_id == user_id).first()
+    if row is not None:
+        return {"user_id": row.user_id, "posts_written": row.posts_written, "votes_received": row.votes_received}
+    if db.query(models.User.id).filter(models.User.id == user_id).first() is None:
+        return None
+    # No counted write since user_stats was added; count the existing rows
+    posts_written, votes_received = db.execute(text(_COUNTS), {"user_id": user_id}).one()
+    return {"user_id": user_id, "posts_written": posts_written, "votes_received": votes_received}
+
+
+@jobs.handler("user_stats.reconcile")
+def reconcile(db: Session):
+    """
+    Recount every user's counters and repair the ones that drifted.
+
+    Drift comes from writes that bypass the API, such as deleting a user,
+    whose cascade removes their upvotes on other users' posts. Users are
+    repaired in ranges of user_stats_reconcile_batch_size IDs, one
+    transaction each, so counter updates are only held up for one range.
+
+    Args:
+        db (Session): A session owned by the job runner.
+    """
+    last_id = db.query(func.max(models.User.id)).scalar() or 0
+    batch_size = settings.user_stats_reconcile_batch_size
+    for first in range(0, last_id + 1, batch_size):
+        bounds = {"first": first, "last": first + batch_size}
+        db.execute(_CREATE_BATCH, bounds)
+        db.commit()
+        db.execute(_LOCK_BATCH, bounds)
+        repaired = db.execute(_RECONCILE_BATCH, bounds).rowcount
+        db.commit()
+        metrics.inc("user_stats.repaired", repaired)
+
+
+jobs.schedule("user_stats.reconcile", settings.user_stats_reconcile_interval_seconds)
@@ -1,3 +1,6 @@
+import base64
+from datetime import datetime
+
 from passlib.context import CryptContext
 
 # Create a CryptContext instance for password hashing
@@ -27,3 +30,36 @@ def verify(plain_password, hashed_password):
         bool: True if the plain password matches the hashed password, False otherwise.
     """
     return pwd_context.verify(plain_password, hashed_password)
+
+def encode_cursor(created_at: datetime, id: int):
+    """
+    Encode the position of the last row of a page into an opaque cursor.
+
+    Args:
+        created_at (datetime): The creation timestamp of the last row.
+        id (int): The ID of the last row, used to break timestamp ties.
+
+    Returns:
+        str: A URL-safe cursor string.
+    """
+    raw = f"{created_at.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor: str):
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor (str): The cursor string sent by the client.
+
+    Returns:
+        tuple: The (created_at, id) position encoded in the cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        created_at, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(id)
+    except (UnicodeDecodeError, ValueError, TypeError) as error:
+        raise ValueError(f"invalid cursor: {cursor}") from error
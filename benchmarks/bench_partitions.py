@@ -0,0 +1,118 @@
+"""
+Feed latency on a plain posts table versus monthly partitions.
+
+Loads the same synthetic data into two schemas of the <database_name>_bench
+database. bench_plain uses single tables. bench_part uses posts range
+partitioned by month and upvotes hash partitioned by post_id, as in
+app.partitions. It then times the GET /posts query restricted to the feed
+window and the per-user keyset page on both.
+
+Usage:
+    python -m benchmarks.bench_partitions [posts] [months] [repeats]
+"""
+import statistics
+import sys
+import time
+from datetime import date
+
+import psycopg2
+
+from app.config import settings
+from app.partitions import UPVOTE_PARTITIONS, add_months
+
+USERS = 1000
+
+FEED_QUERY = """
+SELECT posts.*, count(upvotes.post_id) AS votes FROM posts
+LEFT OUTER JOIN upvotes ON upvotes.post_id = posts.id
+WHERE posts.title LIKE '%%' AND posts.created_at >= now() - interval '7 days'
+GROUP BY posts.id, posts.created_at LIMIT 10
+"""
+
+OWNER_QUERY = """
+SELECT posts.*, count(upvotes.post_id) AS votes FROM posts
+LEFT OUTER JOIN upvotes ON upvotes.post_id = posts.id
+WHERE posts.owner_id = %(owner_id)s
+GROUP BY posts.id, posts.created_at ORDER BY posts.created_at DESC, posts.id DESC LIMIT 10
+"""
+
+
+def create_plain(cursor):
+    cursor.execute("CREATE TABLE posts (id SERIAL PRIMARY KEY, title VARCHAR NOT NULL, content VARCHAR NOT NULL, "
+                   "published BOOLEAN NOT NULL DEFAULT TRUE, created_at TIMESTAMPTZ NOT NULL DEFAULT now(), "
+                   "owner_id INTEGER NOT NULL)")
+    cursor.execute("CREATE TABLE upvotes (user_id INTEGER NOT NULL, post_id INTEGER NOT NULL REFERENCES posts (id), "
+                   "PRIMARY KEY (user_id, post_id))")
+
+
+def create_partitioned(cursor, months):
+    cursor.execute("CREATE TABLE posts (id SERIAL, title VARCHAR NOT NULL, content VARCHAR NOT NULL, "
+                   "published BOOLEAN NOT NULL DEFAULT TRUE, created_at TIMESTAMPTZ NOT NULL DEFAULT now(), "
+                   "owner_id INTEGER NOT NULL, PRIMARY KEY (id, created_at)) PARTITION BY RANGE (created_at)")
+    first = add_months(date.today().replace(day=1), -months)
+    for offset in range(months + 2):
+        month = add_months(first, offset)
+        cursor.execute(f"CREATE TABLE posts_p{month:%Y%m} PARTITION OF posts "
+                       f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')")
+    cursor.execute("CREATE TABLE upvotes (user_id INTEGER NOT NULL, post_id INTEGER NOT NULL, "
+                   "PRIMARY KEY (user_id, post_id)) PARTITION BY HASH (post_id)")
+    for remainder in range(UPVOTE_PARTITIONS):
+        cursor.execute(f"CREATE TABLE upvotes_h{remainder} PARTITION OF upvotes "
+                       f"FOR VALUES WITH (MODULUS {UPVOTE_PARTITIONS}, REMAINDER {remainder})")
+
+
+def load(cursor, posts, months):
+    # Posts spread evenly over the period, three votes each
+    cursor.execute("INSERT INTO posts (title, content, owner_id, created_at) "
+                   "SELECT 'title ' || n, 'content', 1 + n %% %(users)s, "
+                   "now() - (n::float / %(posts)s) * (%(months)s * interval '30 days') "
+                   "FROM generate_series(1, %(posts)s) AS n",
+                   {"users": USERS, "posts": posts, "months": months})
+    cursor.execute("INSERT INTO upvotes (user_id, post_id) SELECT DISTINCT 1 + (id * v) %% %(users)s, id "
+                   "FROM posts, generate_series(1, 3) AS v", {"users": USERS})
+    cursor.execute("CREATE INDEX ON posts (owner_id, created_at)")
+    cursor.execute("CREATE INDEX ON posts (created_at)")
+    cursor.execute("CREATE INDEX ON upvotes (post_id)")
+    cursor.execute("ANALYZE posts")
+    cursor.execute("ANALYZE upvotes")
+
+
+def time_query(cursor, query, repeats, params=None):
+    timings = []
+    for n in range(repeats):
+        start = time.perf_counter()
+        cursor.execute(query, {"owner_id": 1 + n % USERS, **(params or {})})
+        cursor.fetchall()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    posts = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    months = int(sys.argv[2]) if len(sys.argv) > 2 else 24
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+
+    conn = psycopg2.connect(host=settings.database_hostname, port=settings.database_port,
+                            user=settings.database_username, password=settings.database_password,
+                            dbname=f"{settings.database_name}_bench")
+    conn.autocommit = True
+    cursor = conn.cursor()
+
+    print(f"{posts} posts over {months} months, median of {repeats} runs")
+    for schema, create in (("bench_plain", create_plain),
+                           ("bench_part", lambda cur: create_partitioned(cur, months))):
+        cursor.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        cursor.execute(f"CREATE SCHEMA {schema}")
+        cursor.execute(f"SET search_path TO {schema}")
+        create(cursor)
+        load(cursor, posts, months)
+
+        feed = time_query(cursor, FEED_QUERY, repeats)
+        owner = time_query(cursor, OWNER_QUERY, repeats)
+        print(f"{schema:12} feed window: {feed:7.2f} ms   owner page: {owner:7.2f} ms")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Payload size and serialization time of nested versus compact post lists.
+
+Builds synthetic pages of posts and serializes them the way FastAPI does
+(jsonable_encoder, then json.dumps). The nested format embeds the owner in
+every post. The compact format sends each owner once under included.users.
+
+Usage:
+    python -m benchmarks.bench_sideload [iterations]
+"""
+import json
+import sys
+import time
+from datetime import datetime, timezone
+
+from fastapi.encoders import jsonable_encoder
+
+from app import schemas, sideload
+
+
+def make_page(posts, owners):
+    created_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    users = [schemas.UserOut(id=n, email=f"user{n}@example.com", created_at=created_at) for n in range(owners)]
+    return [schemas.PostOut(
+        Post=schemas.Post(id=n, title=f"post title {n}", content="post content " * 4, published=True,
+                          created_at=created_at, owner_id=users[n % owners].id, owner=users[n % owners]),
+        votes=n % 7) for n in range(posts)]
+
+
+def serialize(value):
+    return json.dumps(jsonable_encoder(value)).encode()
+
+
+def measure(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        body = fn()
+    return len(body), (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"{'posts':>5} {'owners':>6} | {'nested':>14} {'compact':>14} | {'size':>6} {'time':>6}")
+    for posts, owners in ((10, 1), (10, 10), (100, 1), (100, 10), (100, 100)):
+        page = make_page(posts, owners)
+        nested_size, nested_time = measure(lambda: serialize(page), iterations)
+        compact_size, compact_time = measure(lambda: serialize(sideload.compact(page)), iterations)
+        print(f"{posts:>5} {owners:>6} | {nested_size:>6} B {nested_time:>5.0f}us "
+              f"{compact_size:>6} B {compact_time:>5.0f}us | "
+              f"{(compact_size / nested_size - 1) * 100:>+5.0f}% {(compact_time / nested_time - 1) * 100:>+5.0f}%")
+
+
+if __name__ == "__main__":
+    main()
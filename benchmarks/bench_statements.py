@@ -0,0 +1,81 @@
+"""
+CPU cost per request of building and executing the hot router queries.
+
+Compares the legacy db.query(...) form of each query with the prebuilt
+statements in app.queries. Both run against an empty in-memory SQLite
+database, so the timings are dominated by Python-side statement construction,
+cache key generation and compilation rather than I/O.
+
+Usage:
+    python -m benchmarks.bench_statements [iterations]
+"""
+import sys
+import time
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from app import models, queries
+from app.metrics import metrics
+
+# SQLite cannot run the Postgres DDL of the models, so create equivalent tables by hand
+SCHEMA = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR UNIQUE NOT NULL, "
+    "password VARCHAR NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)",
+    "CREATE TABLE posts (id INTEGER PRIMARY KEY, title VARCHAR NOT NULL, content VARCHAR NOT NULL, "
+    "published BOOLEAN DEFAULT 1, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, owner_id INTEGER NOT NULL)",
+    "CREATE TABLE upvotes (user_id INTEGER, post_id INTEGER, PRIMARY KEY (user_id, post_id))",
+]
+
+
+def legacy_queries(db):
+    # The queries as the routers built them before app.queries existed
+    db.query(models.Post, func.count(models.Upvote.post_id).label("votes")).join(
+        models.Upvote, models.Upvote.post_id == models.Post.id, isouter=True).group_by(
+        models.Post.id).filter(models.Post.title.contains("")).limit(10).offset(0).all()
+    db.query(models.Post, func.count(models.Upvote.post_id).label("votes")).join(
+        models.Upvote, models.Upvote.post_id == models.Post.id, isouter=True).group_by(
+        models.Post.id).filter(models.Post.id == 1).first()
+    db.query(models.User).filter(models.User.id == 1).first()
+    db.query(models.User).filter(models.User.email == "user@example.com").first()
+
+
+def prebuilt_queries(db):
+    db.execute(queries.FEED_PAGE, {"search": "", "limit": 10, "skip": 0}).all()
+    db.execute(queries.POST_BY_ID, {"id": 1}).first()
+    db.execute(queries.USER_BY_ID, {"id": 1}).scalars().first()
+    db.execute(queries.USER_BY_EMAIL, {"email": "user@example.com"}).scalars().first()
+
+
+def measure(fn, session_factory, iterations):
+    # Warm the compiled cache first so both variants are measured in steady state
+    with session_factory() as db:
+        fn(db)
+    start = time.process_time()
+    for _ in range(iterations):
+        with session_factory() as db:
+            fn(db)
+    return (time.process_time() - start) / iterations
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        for ddl in SCHEMA:
+            conn.exec_driver_sql(ddl)
+    session_factory = sessionmaker(bind=engine)
+
+    legacy = measure(legacy_queries, session_factory, iterations)
+    prebuilt = measure(prebuilt_queries, session_factory, iterations)
+
+    print(f"iterations: {iterations} (4 queries each)")
+    print(f"legacy db.query:     {legacy * 1e6:8.1f} us CPU per request")
+    print(f"prebuilt statements: {prebuilt * 1e6:8.1f} us CPU per request")
+    print(f"saved:               {(1 - prebuilt / legacy) * 100:8.1f} %")
+    print("compiled cache:", {name: value for name, value in metrics.snapshot()["counters"].items()
+                              if name.startswith("sql.compiled_cache")})
+
+
+if __name__ == "__main__":
+    main()
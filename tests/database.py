@@ -7,6 +7,7 @@ from app.main import app
 from app.config import settings
 from app.database import get_db
 from app.database import Base
+from app import cache
 
 # Define the database URL for testing
 # Note: The hardcoded URL is commented out in favor of using environment variables
@@ -28,6 +29,8 @@ def session():
     Base.metadata.drop_all(bind=engine)
     # Create all tables in the test database
     Base.metadata.create_all(bind=engine)
+    # Cached pages from a previous test would outlive its database
+    cache.feed_cache.clear()
     # Create a new session
     db = TestingSessionLocal()
     try:
@@ -0,0 +1,139 @@
+import threading
+import time
+
+import pytest
+from app import cache, database
+from app.cache import ResponseCache
+
+
+class FakeSession:
+    def close(self):
+        pass
+
+
+# Fixture to create a cache with a short TTL and stale window
+@pytest.fixture()
+def feed_cache():
+    return ResponseCache(name="test_cache", ttl=0.05, stale_ttl=0.5, max_entries=2, session_factory=FakeSession)
+
+
+# Test a fresh entry is served without calling the loader again
+def test_cache_hit(feed_cache):
+    calls = []
+    loader = lambda db: calls.append(1) or "page"
+
+    assert feed_cache.get("key", loader, FakeSession()) == "page"
+    assert feed_cache.get("key", loader, FakeSession()) == "page"
+    assert len(calls) == 1
+
+
+# Test concurrent misses for the same key share a single load
+def test_cache_single_flight(feed_cache):
+    calls = []
+    release = threading.Event()
+
+    def loader(db):
+        calls.append(1)
+        release.wait(1)
+        return "page"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(feed_cache.get("key", loader, FakeSession())))
+               for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["page"] * 20
+    assert len(calls) == 1
+
+
+# Test a stale entry is served while a background refresh replaces it
+def test_cache_stale_while_revalidate(feed_cache):
+    values = iter(["old", "new"])
+    loader = lambda db: next(values)
+
+    assert feed_cache.get("key", loader, FakeSession()) == "old"
+    time.sleep(0.1)
+    assert feed_cache.get("key", loader, FakeSession()) == "old"
+    time.sleep(0.05)
+    assert feed_cache.get("key", loader, FakeSession()) == "new"
+
+
+# Test invalidation forces a reload
+def test_cache_invalidate(feed_cache):
+    values = iter(["old", "new"])
+    loader = lambda db: next(values)
+
+    feed_cache.get("key", loader, FakeSession())
+    feed_cache.invalidate()
+    assert feed_cache.get("key", loader, FakeSession()) == "new"
+
+
+# Test the last known value is served when the database is unavailable
+def test_cache_serves_stale_on_error(feed_cache):
+    feed_cache.get("key", lambda db: "old", FakeSession())
+    feed_cache.invalidate()
+
+    def failing_loader(db):
+        raise ConnectionError("database unavailable")
+
+    assert feed_cache.get("key", failing_loader, FakeSession()) == "old"
+    with pytest.raises(ConnectionError):
+        feed_cache.get("other", failing_loader, FakeSession())
+
+
+# Test the least recently used key is evicted past max_entries
+def test_cache_eviction(feed_cache):
+    calls = []
+    loader = lambda db: calls.append(1) or "page"
+
+    for key in ("a", "b", "c", "a"):
+        feed_cache.get(key, loader, FakeSession())
+    assert len(calls) == 4
+
+
+# Test warming reloads an invalidated entry in the background so the next read is a hit
+def test_cache_warm(feed_cache):
+    versions = iter(["old", "new"])
+    loader = lambda db: next(versions)
+    feed_cache.get("key", loader, FakeSession())
+    feed_cache.invalidate()
+
+    feed_cache.warm("key", loader)
+    feed_cache._executor.submit(lambda: None).result(1)
+    time.sleep(0.01)
+
+    assert feed_cache.get("key", lambda db: "loaded again", FakeSession()) == "new"
+
+
+# Test background refreshes load through the cache's session factory, never the request's session
+def test_cache_refresh_uses_session_factory():
+    sessions = []
+
+    class RecordingSession(FakeSession):
+        def __init__(self):
+            self.closed = False
+            sessions.append(self)
+
+        def close(self):
+            self.closed = True
+
+    refreshing = ResponseCache(name="test_cache", ttl=0.05, stale_ttl=0.5, max_entries=2,
+                               session_factory=RecordingSession)
+    request_session = FakeSession()
+    used = []
+    loader = lambda db: used.append(db) or len(used)
+
+    refreshing.get("key", loader, request_session)
+    refreshing.warm("key", loader)
+    refreshing._executor.submit(lambda: None).result(1)
+    time.sleep(0.01)
+
+    assert used[0] is request_session
+    assert used[1:] == sessions and sessions[0].closed
+    # The shared feed cache refreshes on the background pool, not the request pool
+    assert cache.feed_cache.session_factory is database.BackgroundSessionLocal
@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+
+from app import idempotency
+
+
+class FakeSession:
+    """
+    Answers each execute() with the next of the given rows.
+    """
+
+    def __init__(self, *rows):
+        self.rows = list(rows)
+        self.rolled_back = False
+
+    def execute(self, statement, params):
+        return SimpleNamespace(first=lambda row=self.rows.pop(0): row)
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+# Test a key swept between the claim and the read is claimed again instead of failing
+def test_begin_reclaims_swept_key():
+    db = FakeSession(None, None, SimpleNamespace(key="k"))
+    assert idempotency.begin(db, 1, "k", "hash") is None
+    assert db.rows == [] and not db.rolled_back
+
+
+# Test a live key replays its stored response
+def test_begin_replays_stored_response():
+    db = FakeSession(None, SimpleNamespace(request_hash="hash", status_code=201, response={"id": 1}))
+    replay = idempotency.begin(db, 1, "k", "hash")
+    assert replay.status_code == 201 and replay.headers["Idempotent-Replayed"] == "true"
+    assert db.rolled_back
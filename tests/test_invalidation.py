@@ -0,0 +1,58 @@
+import json
+import time
+
+from app import invalidation
+
+
+# Test events from other workers run the local handlers and record delivery lag
+def test_listener_dispatches_foreign_events(monkeypatch):
+    received = []
+    monkeypatch.setattr(invalidation, "_handlers", {"post": [received.append]})
+    listener = invalidation.InvalidationListener("postgresql://unused", "test_channel")
+
+    listener._handle(json.dumps({"kind": "post", "id": 7, "ts": time.time(), "origin": "other-worker"}))
+
+    assert received == [7]
+    assert invalidation.metrics.snapshot()["observations"]["invalidation.delivery_lag_seconds"]["count"] >= 1
+
+
+# Test this worker's own events are not dispatched a second time
+def test_listener_skips_own_events(monkeypatch):
+    received = []
+    monkeypatch.setattr(invalidation, "_handlers", {"post": [received.append]})
+    listener = invalidation.InvalidationListener("postgresql://unused", "test_channel")
+
+    listener._handle(json.dumps({"kind": "post", "id": 7, "ts": time.time(), "origin": invalidation._ORIGIN}))
+
+    assert received == []
+
+
+# Test payloads that are not events are skipped instead of raising
+def test_listener_skips_malformed_payloads(monkeypatch):
+    received = []
+    monkeypatch.setattr(invalidation, "_handlers", {"post": [received.append]})
+    listener = invalidation.InvalidationListener("postgresql://unused", "test_channel")
+
+    for payload in ["not json", "1", "[]", '{"kind": "post"}', '{"ts": 1}', '{"kind": "post", "ts": "now"}']:
+        listener._handle(payload)
+
+    assert received == []
+
+
+# Test an unexpected error reconnects the listener instead of ending its thread
+def test_listener_survives_unexpected_errors(monkeypatch):
+    listener = invalidation.InvalidationListener("postgresql://unused", "test_channel")
+    attempts = []
+
+    def connect(dsn):
+        attempts.append(dsn)
+        if len(attempts) == 2:
+            listener._stop.set()
+        raise TypeError("unexpected")
+
+    monkeypatch.setattr(invalidation.psycopg2, "connect", connect)
+    monkeypatch.setattr(listener._stop, "wait", lambda delay: None)
+    listener._run()
+
+    assert len(attempts) == 2
+    assert invalidation.metrics.snapshot()["gauges"]["invalidation.connected"] == 0
@@ -0,0 +1,58 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from app import jobs
+
+
+# Test a worker keeps running when a job's outcome cannot be recorded
+def test_worker_survives_database_outage(monkeypatch):
+    monkeypatch.setattr(jobs.settings, "job_poll_interval_seconds", 0.01)
+    runner = jobs.JobRunner(session_factory=None, workers=1)
+    claims = []
+
+    def claim():
+        claims.append(1)
+        return SimpleNamespace(id=len(claims), kind="test", payload={}, attempts=1)
+
+    def run(job):
+        raise ConnectionError("database is down")
+
+    monkeypatch.setattr(runner, "_claim", claim)
+    monkeypatch.setattr(runner, "_run", run)
+
+    async def scenario():
+        runner._stopping = asyncio.Event()
+        worker = asyncio.create_task(runner._work())
+        await asyncio.sleep(0.1)
+        runner._stopping.set()
+        await worker
+
+    asyncio.run(scenario())
+    assert len(claims) > 1
+
+
+class FakeSession:
+    def __init__(self, statements):
+        self.statements = statements
+
+    def execute(self, statement):
+        self.statements.append(statement)
+
+    def commit(self):
+        self.statements.append("commit")
+
+    def close(self):
+        pass
+
+
+# Test a burst of after-commit requests enqueues each kind once, in one transaction
+def test_deferred_enqueue_coalesces():
+    statements = []
+    deferred = jobs.DeferredEnqueue(lambda: FakeSession(statements), delay=0.05)
+    for _ in range(100):
+        deferred.add("feed.warm")
+    deferred.add("other")
+    time.sleep(0.2)
+
+    assert len(statements) == 3 and statements[-1] == "commit"
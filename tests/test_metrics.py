@@ -0,0 +1,17 @@
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import app
+
+
+# Test /metrics is hidden without a token and only served to requests carrying it
+def test_metrics_requires_token(monkeypatch):
+    client = TestClient(app)
+    monkeypatch.setattr(settings, "metrics_token", "")
+    assert client.get("/metrics/", headers={"Authorization": "Bearer "}).status_code == 404
+
+    monkeypatch.setattr(settings, "metrics_token", "scrape")
+    assert client.get("/metrics/").status_code == 401
+    assert client.get("/metrics/", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    res = client.get("/metrics/", headers={"Authorization": "Bearer scrape"})
+    assert res.status_code == 200
+    assert "counters" in res.json()
@@ -1,5 +1,12 @@
+import threading
+import time
 import pytest
-from app import schemas
+from sqlalchemy import event
+from app import schemas, models, jobs as app_jobs
+from app.oauth2 import create_access_token
+from app.repository import SQLAlchemyPostRepository
+from app.routers import post as post_router
+from tests.database import engine, TestingSessionLocal
 
 # Test retrieving all posts for an authorized user
 def test_get_all_posts(authorized_client, test_posts):
@@ -135,3 +142,116 @@ def test_update_post_non_exist(authorized_client, test_user, test_posts):
     res = authorized_client.put(
         f"/posts/8000000", json=data)
     assert res.status_code == 404
+
+# Test fetching several posts at once keeps the requested order and reports missing ids
+def test_get_posts_batch(authorized_client, test_posts):
+    ids = [test_posts[2].id, 88888, test_posts[0].id]
+    res = authorized_client.get("/posts/batch", params={"ids": ids})
+    batch = schemas.PostBatch(**res.json())
+
+    assert res.status_code == 200
+    assert [post.Post.id for post in batch.posts] == [test_posts[2].id, test_posts[0].id]
+    assert batch.missing == [88888]
+
+# Test the number of ids in a batch is capped
+def test_get_posts_batch_too_many(authorized_client, test_posts):
+    res = authorized_client.get("/posts/batch", params={"ids": list(range(1, 1000))})
+    assert res.status_code == 400
+
+# Test that unauthorized users cannot fetch a batch of posts
+def test_unauthorized_user_get_posts_batch(client, test_posts):
+    res = client.get("/posts/batch", params={"ids": [test_posts[0].id]})
+    assert res.status_code == 401
+
+# Test post writes request feed warming after commit instead of queueing it in their transaction
+def test_create_post_enqueues_feed_warm(authorized_client, session, test_posts, monkeypatch):
+    requested = []
+    monkeypatch.setattr(app_jobs.deferred, "add", requested.append)
+    for n in range(3):
+        res = authorized_client.post("/posts/", json={"title": f"title {n}", "content": "content"})
+        assert res.status_code == 201
+
+    assert requested == ["feed.warm"] * 3
+    assert session.query(models.Job).filter(models.Job.kind == "feed.warm").count() == 0
+
+# Test a retried create with the same Idempotency-Key replays the first post
+def test_create_post_idempotent_retry(authorized_client, session, test_user, test_posts):
+    headers = {"Idempotency-Key": "create-post-1"}
+    data = {"title": "retried title", "content": "retried content"}
+    first = authorized_client.post("/posts/", json=data, headers=headers)
+    retry = authorized_client.post("/posts/", json=data, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json()["id"] == first.json()["id"]
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert session.query(models.Post).filter(models.Post.title == "retried title").count() == 1
+
+# Test an Idempotency-Key cannot be reused for a different post
+def test_create_post_idempotency_key_reused(authorized_client, test_user, test_posts):
+    headers = {"Idempotency-Key": "create-post-2"}
+    authorized_client.post("/posts/", json={"title": "first", "content": "content"}, headers=headers)
+    res = authorized_client.post("/posts/", json={"title": "second", "content": "content"}, headers=headers)
+    assert res.status_code == 422
+
+# Test the compact format sends each owner once and references it by id
+def test_get_posts_compact(authorized_client, test_posts):
+    res = authorized_client.get("/posts/", params={"format": "compact"})
+    page = schemas.PostListCompact(**res.json())
+
+    assert res.status_code == 200
+    assert len(page.posts) == len(test_posts)
+    assert {post.owner_id for post in page.posts} == set(page.included.users)
+
+# Test the compact format can be selected with the Accept header
+def test_get_posts_compact_accept_header(authorized_client, test_posts):
+    res = authorized_client.get("/posts/", headers={"Accept": "application/vnd.posts.compact+json"})
+    assert "included" in res.json()
+    assert res.headers["content-type"] == "application/vnd.posts.compact+json"
+    assert res.headers["vary"] == "Accept"
+
+    res = authorized_client.get("/posts/", params={"format": "compact"})
+    assert res.headers["content-type"] == "application/json"
+
+
+# Test concurrent GET /posts/{id} requests for one post run a single query
+def test_get_one_post_concurrent_single_query(test_user, test_posts):
+    post_id = test_posts[0].id
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+        # Keep the query in flight while the other requests arrive
+        time.sleep(0.2)
+
+    callers = 8
+    barrier = threading.Barrier(callers)
+    results = []
+
+    def request():
+        db = TestingSessionLocal()
+        try:
+            barrier.wait()
+            results.append(post_router.get_post(post_id, posts=SQLAlchemyPostRepository(db), user_id=test_user['id']))
+        finally:
+            db.close()
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        threads = [threading.Thread(target=request) for _ in range(callers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert len(results) == callers
+    assert {result.Post.id for result in results} == {post_id}
+    assert len([statement for statement in statements if "FROM posts" in statement]) == 1
+
+
+# Test a token of a user that no longer exists is rejected
+def test_get_posts_unknown_user(client, session):
+    token = create_access_token({"user_id": 999999})
+    res = client.get("/posts/", headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 401
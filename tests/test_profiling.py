@@ -0,0 +1,88 @@
+import asyncio
+import json
+import threading
+import time
+
+import anyio
+
+from app.config import settings
+from app.profiling import ProfilingMiddleware, SamplingProfiler
+
+
+def busy_handler(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def other_request(seconds):
+    busy_handler(seconds)
+
+
+def sync_endpoint(seconds):
+    busy_handler(seconds)
+
+
+# Test the profiler records the stacks of the code running while it samples
+def test_profiler_samples_busy_code():
+    profiler = SamplingProfiler(0.001)
+    profiler.start()
+    busy_handler(0.1)
+    profiler.stop()
+
+    assert any("busy_handler" in line for line in profiler.collapsed().splitlines())
+
+
+# Test the speedscope output references the shared frames of every sample
+def test_profiler_speedscope_format():
+    profiler = SamplingProfiler(0.001)
+    profiler.start()
+    busy_handler(0.05)
+    profiler.stop()
+
+    document = json.loads(json.dumps(profiler.speedscope("GET /posts/{id} 200 50.0ms", 50.0)))
+    profile = document["profiles"][0]
+    frames = document["shared"]["frames"]
+    assert profile["type"] == "sampled"
+    assert len(profile["samples"]) == len(profile["weights"]) > 0
+    assert all(index < len(frames) for sample in profile["samples"] for index in sample)
+
+
+# Test a request's profiler records its own event loop and threadpool work but not other requests
+def test_profiler_follows_its_request():
+    unrelated = threading.Thread(target=other_request, args=(0.4,))
+    unrelated.start()
+
+    async def request():
+        profiler = SamplingProfiler(0.001, asyncio.current_task())
+        profiler.start()
+        busy_handler(0.05)
+        await anyio.to_thread.run_sync(sync_endpoint, 0.1)
+        await asyncio.to_thread(profiler.stop)
+        return profiler
+
+    async def server():
+        profiler, _ = await asyncio.gather(request(), anyio.to_thread.run_sync(other_request, 0.2))
+        return profiler
+
+    lines = asyncio.run(server()).collapsed().splitlines()
+    unrelated.join()
+
+    assert any("sync_endpoint" in line for line in lines)
+    assert any("busy_handler" in line and "sync_endpoint" not in line for line in lines)
+    assert not any("other_request" in line for line in lines)
+
+
+# Test a non-matching X-Profile header falls back to random sampling
+def test_mismatched_profile_header_uses_sample_rate(monkeypatch):
+    monkeypatch.setattr(settings, "profiling_token", "secret")
+    middleware = ProfilingMiddleware(None)
+
+    def scope(value):
+        return {"headers": [(b"x-profile", value)]}
+
+    monkeypatch.setattr(settings, "profiling_sample_rate", 0.0)
+    assert middleware._selected(scope(b"secret"))
+    assert not middleware._selected(scope(b"wrong"))
+    monkeypatch.setattr(settings, "profiling_sample_rate", 1.0)
+    assert middleware._selected(scope(b"wrong"))
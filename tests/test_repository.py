@@ -0,0 +1,107 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.oauth2 import create_access_token
+from app.repository import InMemoryPostRepository, SQLAlchemyPostRepository, create_repository, get_repository
+
+
+def post(title):
+    return {"title": title, "content": "content", "published": True}
+
+
+# Test posts are found by ID and listed newest first
+def test_create_get_and_list():
+    repository = InMemoryPostRepository()
+    first = repository.create(1, post("first"))
+    second = repository.create(2, post("second"))
+
+    assert repository.get(first.id).Post == first
+    assert repository.get(999) is None
+    assert repository.owner_of(second.id) == 2
+    assert [p.Post.id for p in repository.list(10, 0)] == [second.id, first.id]
+    assert [p.Post.id for p in repository.list(1, 1)] == [first.id]
+    assert [p.Post.id for p in repository.get_many([first.id, 999])] == [first.id]
+
+
+# Test listing by title search and the viewer's voted_by_me flag
+def test_list_filters():
+    repository = InMemoryPostRepository()
+    ids = [repository.create(owner, post(f"post {n}")).id for n, owner in enumerate([1, 2, 1, 1])]
+
+    assert [p.Post.id for p in repository.list(10, 0, search="post 1")] == [ids[1]]
+    assert [p.Post.id for p in repository.list(2, 1, search="post")] == [ids[2], ids[1]]
+    assert {p.voted_by_me for p in repository.list(10, 0)} == {None}
+    assert {p.voted_by_me for p in repository.list(10, 0, viewer_id=1)} == {False}
+
+
+# Test updates and deletes keep the index consistent
+def test_update_and_delete():
+    repository = InMemoryPostRepository()
+    created = repository.create(1, post("old"))
+    other = repository.create(1, post("other"))
+
+    updated = repository.update(created.id, post("new"))
+    assert updated.title == "new" and updated.created_at == created.created_at
+    assert repository.update(999, post("new")) is None
+
+    assert repository.delete(created.id) is True
+    assert repository.delete(created.id) is False
+    assert repository.get(created.id) is None
+    assert repository.owner_of(created.id) is None
+    assert [p.Post.id for p in repository.list(10, 0)] == [other.id]
+
+
+# Test backends are selected by name and an unknown one is rejected
+def test_create_repository():
+    assert isinstance(create_repository("sqlalchemy", None), SQLAlchemyPostRepository)
+    assert isinstance(create_repository("memory", None), InMemoryPostRepository)
+    with pytest.raises(ValueError):
+        create_repository("redis", None)
+
+
+@pytest.fixture(params=["sqlalchemy", "memory"])
+def posts_client(request):
+    """
+    A client authenticated as a user, with /posts served by each backend in turn.
+    """
+    if request.param == "sqlalchemy":
+        yield request.getfixturevalue("authorized_client"), request.getfixturevalue("test_user")["id"]
+        return
+    repository = InMemoryPostRepository()
+    app.dependency_overrides[get_repository] = lambda: repository
+    client = TestClient(app)
+    client.headers = {**client.headers, "Authorization": f"Bearer {create_access_token({'user_id': 7})}"}
+    try:
+        yield client, 7
+    finally:
+        del app.dependency_overrides[get_repository]
+
+
+# Test the /posts handlers serve the same shapes from every backend
+def test_posts_http(posts_client):
+    client, user_id = posts_client
+
+    res = client.post("/posts/", json=post("first"))
+    assert res.status_code == 201
+    created = res.json()
+    assert (created["owner_id"], created["owner"]["id"], created["title"]) == (user_id, user_id, "first")
+
+    res = client.get(f"/posts/{created['id']}")
+    assert res.status_code == 200
+    assert res.json() == {"Post": created, "votes": 0, "voted_by_me": None}
+    assert client.get(f"/posts/{created['id']}?voted_by_me=true").json()["voted_by_me"] is False
+    assert client.get("/posts/999999").status_code == 404
+
+    assert [p["Post"]["id"] for p in client.get("/posts/").json()] == [created["id"]]
+    compact = client.get("/posts/?format=compact").json()
+    assert list(compact["included"]["users"]) == [str(user_id)]
+    assert client.get(f"/posts/batch?ids={created['id']}&ids=999999").json()["missing"] == [999999]
+
+    res = client.put(f"/posts/{created['id']}", json=post("second"))
+    assert res.status_code == 200
+    assert res.json()["title"] == "second"
+    assert client.get(f"/posts/{created['id']}").json()["Post"]["title"] == "second"
+
+    assert client.delete(f"/posts/{created['id']}").status_code == 204
+    assert client.get(f"/posts/{created['id']}").status_code == 404
+    assert client.delete(f"/posts/{created['id']}").status_code == 404
@@ -0,0 +1,48 @@
+import pytest
+from app.__main__ import server_options, worker_count
+from app.config import settings
+from app.database import background_pool_size, max_workers, pool_size, sharing_workers
+
+
+# Test worker pools together stay within the connection budget, LISTEN connections included
+def test_pool_size_fits_budget():
+    for budget, workers, background in [(90, 1, 7), (90, 4, 7), (90, 11, 6), (20, 2, 3)]:
+        assert (pool_size(budget, workers, background) + 1 + background) * workers <= budget
+    assert pool_size(90, 4, 7) == 14
+    assert pool_size(90, 11, 6) == 1
+
+
+# Test a worker count the budget cannot serve is refused
+def test_pool_size_refuses_too_many_workers():
+    assert max_workers(90, 7) == 10
+    with pytest.raises(ValueError):
+        pool_size(90, 11, 7)
+    with pytest.raises(ValueError):
+        pool_size(4, 8, 0)
+
+
+# Test a process started without a worker count is sized as the only one
+def test_sharing_workers(monkeypatch):
+    monkeypatch.setattr(settings, "web_concurrency", 0)
+    assert sharing_workers() == 1
+    monkeypatch.setattr(settings, "web_concurrency", 4)
+    assert sharing_workers() == 4
+
+
+# Test the launcher clamps the worker count to what the budget can serve
+def test_worker_count_clamped(monkeypatch):
+    monkeypatch.setattr(settings, "web_concurrency", 1000)
+    assert worker_count() == max_workers(settings.db_connection_budget, background_pool_size())
+    monkeypatch.setattr(settings, "web_concurrency", 2)
+    assert worker_count() == 2
+
+
+# Test the launcher takes its socket options from the settings
+def test_server_options_from_settings():
+    options = server_options()
+    assert options["workers"] >= 1
+    assert options["timeout_keep_alive"] == settings.web_keep_alive_seconds
+    assert options["backlog"] == settings.web_backlog
+    assert options["timeout_graceful_shutdown"] == settings.web_graceful_timeout_seconds
+    assert options["loop"] in ("uvloop", "asyncio")
+    assert options["http"] in ("httptools", "h11")
@@ -0,0 +1,53 @@
+import threading
+import time
+
+import pytest
+from app.singleflight import SingleFlight
+
+
+# Test N concurrent identical callers trigger a single query and share its result
+def test_concurrent_callers_share_one_query():
+    group = SingleFlight("test_flight")
+    queries = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def query():
+        queries.append(1)
+        started.set()
+        release.wait(1)
+        return {"id": 1, "votes": 3}
+
+    results = []
+    callers = [threading.Thread(target=lambda: results.append(group.do(("post", 1), query)))
+               for _ in range(50)]
+    callers[0].start()
+    started.wait(1)
+    for caller in callers[1:]:
+        caller.start()
+    time.sleep(0.1)
+    release.set()
+    for caller in callers:
+        caller.join()
+
+    assert len(queries) == 1
+    assert results == [{"id": 1, "votes": 3}] * 50
+
+
+# Test different keys are not coalesced
+def test_different_keys_run_separately():
+    group = SingleFlight("test_flight")
+    assert group.do(1, lambda: "a") == "a"
+    assert group.do(2, lambda: "b") == "b"
+
+
+# Test the error of the shared call reaches every caller, and is not kept afterwards
+def test_error_is_shared_then_forgotten():
+    group = SingleFlight("test_flight")
+
+    def failing():
+        raise ConnectionError("database unavailable")
+
+    with pytest.raises(ConnectionError):
+        group.do(1, failing)
+    assert group.do(1, lambda: "recovered") == "recovered"
@@ -0,0 +1,121 @@
+import time
+from types import SimpleNamespace
+
+from app.suggest import PrefixIndex
+
+
+def make_index(max_entries=100000, session_factory=None):
+    return PrefixIndex(max_entries=max_entries, max_scan=100, session_factory=session_factory, refresh_delay=0.05)
+
+
+# Test suggestions match any word start and are ordered by votes
+def test_suggest_orders_by_votes():
+    index = make_index()
+    index.upsert(1, "Hello world", 1, True)
+    index.upsert(2, "Hello big world", 5, True)
+    index.upsert(3, "Goodbye", 9, True)
+
+    assert [post["id"] for post in index.suggest("hel", 10)] == [2, 1]
+    assert [post["id"] for post in index.suggest("WOR", 10)] == [2, 1]
+    assert [post["id"] for post in index.suggest("big w", 10)] == [2]
+    assert [post["id"] for post in index.suggest("hello big", 10)] == [2]
+    assert index.suggest("hello", 1) == [{"id": 2, "title": "Hello big world", "votes": 5}]
+    assert index.suggest("  ", 10) == []
+
+
+# Test the ranking covers every match, not the alphabetically first ones
+def test_suggest_ranks_all_matches():
+    index = make_index()
+    for post_id in range(3000):
+        index.upsert(post_id, f"apple {post_id:05}", 0, True)
+    index.upsert(5000, "azure launch", 1000, True)
+    index.upsert(5001, "applesauce recipes", 10, True)
+
+    assert [post["id"] for post in index.suggest("a", 3)][:2] == [5000, 5001]
+    assert [post["id"] for post in index.suggest("applesau", 3)] == [5001]
+
+
+# Test updates replace the old title and unpublishing or deleting removes the post
+def test_upsert_and_remove():
+    index = make_index()
+    index.upsert(1, "First title", 0, True)
+    index.upsert(1, "Renamed", 2, True)
+    assert index.suggest("first", 10) == []
+    assert index.suggest("ren", 10) == [{"id": 1, "title": "Renamed", "votes": 2}]
+
+    index.upsert(1, "Renamed", 2, False)
+    assert index.suggest("ren", 10) == []
+
+    index.upsert(2, "Other", 0, True)
+    index.remove(2)
+    assert index.suggest("oth", 10) == []
+    assert len(index) == 0
+
+
+# Test the index stays bounded by dropping the least voted posts
+def test_index_is_bounded():
+    index = make_index(max_entries=60)
+    for post_id in range(20):
+        index.upsert(post_id, f"post{post_id:02}", post_id, True)
+
+    assert len(index) <= 66
+    assert index.suggest("post", 1)[0]["id"] == 19
+    assert index.suggest("post00", 10) == []
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+        self.fetched = 0
+
+    def __iter__(self):
+        for row in self.rows:
+            self.fetched += 1
+            yield row
+
+    def all(self):
+        return list(self)
+
+
+class FakeSession:
+    def __init__(self, queries, rows):
+        self.queries = queries
+        self.rows = rows
+
+    def execute(self, statement):
+        self.queries.append(FakeResult(self.rows))
+        return self.queries[-1]
+
+    def close(self):
+        pass
+
+
+# Test a burst of change events reloads the changed posts with a single query
+def test_refresh_batches_events():
+    queries = []
+    rows = [SimpleNamespace(id=1, title="Hot post", published=True, votes=42)]
+    index = make_index(session_factory=lambda: FakeSession(queries, rows))
+    index.upsert(2, "Deleted post", 3, True)
+
+    for _ in range(100):
+        index.refresh(1)
+    index.refresh(2)
+    time.sleep(0.2)
+
+    assert len(queries) == 1
+    assert index.suggest("post", 10) == [{"id": 1, "title": "Hot post", "votes": 42}]
+
+
+# Test a rebuild stops reading posts once the index is full, most voted first
+def test_rebuild_is_bounded_while_loading():
+    queries = []
+    # One six-letter word each: six prefix entries per post
+    rows = [(post_id, f"title{post_id % 10}", 1000 - post_id) for post_id in range(1000)]
+    index = make_index(max_entries=60, session_factory=lambda: FakeSession(queries, rows))
+
+    index.rebuild()
+
+    # Ten posts fill the index; the eleventh row read is the one that would overflow it
+    assert queries[0].fetched == 11
+    assert len(index) == 60
+    assert index.suggest("title0", 10) == [{"id": 0, "title": "title0", "votes": 1000}]
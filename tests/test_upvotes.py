@@ -1,10 +1,10 @@
 import pytest
-from app import models
+from app import cache, models, schemas
 
 # Fixture to create a test vote
 @pytest.fixture()
 def test_vote(test_posts, session, test_user):
-    new_vote = models.Vote(post_id=test_posts[3].id, user_id=test_user['id'])
+    new_vote = models.Upvote(post_id=test_posts[3].id, user_id=test_user['id'])
     session.add(new_vote)
     session.commit()
 
@@ -43,3 +43,41 @@ def test_vote_unauthorized_user(client, test_posts):
     res = client.post(
         "/vote/", json={"post_id": test_posts[3].id, "dir": 1})
     assert res.status_code == 401  # Unauthorized status code
+
+# Test a retried vote with the same Idempotency-Key replays the success instead of a conflict
+def test_vote_idempotent_retry(authorized_client, test_posts):
+    headers = {"Idempotency-Key": "vote-1"}
+    data = {"post_id": test_posts[3].id, "dir": 1}
+    first = authorized_client.post("/Upvote/", json=data, headers=headers)
+    retry = authorized_client.post("/Upvote/", json=data, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+
+# Test voted_by_me reflects the current user's votes when requested
+def test_get_post_voted_by_me(authorized_client, test_posts, test_vote):
+    # Read the IDs first; the request closes the session the posts belong to
+    voted_id, not_voted_id = test_posts[3].id, test_posts[0].id
+    voted = authorized_client.get(f"/posts/{voted_id}", params={"voted_by_me": True})
+    not_voted = authorized_client.get(f"/posts/{not_voted_id}", params={"voted_by_me": True})
+
+    assert schemas.PostOut(**voted.json()).voted_by_me is True
+    assert schemas.PostOut(**not_voted.json()).voted_by_me is False
+
+# Test every post of a feed page carries voted_by_me when requested, and none otherwise
+def test_get_posts_voted_by_me(authorized_client, test_posts, test_vote):
+    voted_id = test_posts[3].id
+    with_flag = [schemas.PostOut(**post) for post in
+                 authorized_client.get("/posts/", params={"voted_by_me": True}).json()]
+    without_flag = [schemas.PostOut(**post) for post in authorized_client.get("/posts/").json()]
+
+    assert {post.Post.id for post in with_flag if post.voted_by_me} == {voted_id}
+    assert all(post.voted_by_me is None for post in without_flag)
+
+# Test pages with a viewer's voted_by_me flags are not cached with the shared pages
+def test_get_posts_voted_by_me_not_cached(authorized_client, test_posts):
+    authorized_client.get("/posts/", params={"voted_by_me": True})
+    assert len(cache.feed_cache._entries) == 0
+
+    authorized_client.get("/posts/")
+    assert list(cache.feed_cache._entries) == [(10, 0, "")]
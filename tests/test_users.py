@@ -1,6 +1,6 @@
 import pytest
 from jose import jwt
-from app import schemas
+from app import models, schemas
 from app.config import settings
 
 
@@ -53,3 +53,92 @@ def test_incorrect_login(test_user, client, email, password, status_code):
     assert res.status_code == status_code
     # Note: The following assertion is commented out
     # assert res.json().get('detail') == 'Invalid Credentials'
+
+
+# Test listing a user's posts returns only that user's posts, newest first
+def test_get_user_posts(authorized_client, test_user, test_posts):
+    res = authorized_client.get(f"/users/{test_user['id']}/posts")
+    page = schemas.PostPage(**res.json())
+
+    assert res.status_code == 200
+    assert all(post.Post.owner_id == test_user['id'] for post in page.items)
+    created = [post.Post.created_at for post in page.items]
+    assert created == sorted(created, reverse=True)
+
+
+# Test walking the authenticated user's posts page by page with the cursor
+def test_get_my_posts_paginated(authorized_client, test_user, test_posts):
+    own_posts = [post for post in test_posts if post.owner_id == test_user['id']]
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 1}
+        if cursor:
+            params["cursor"] = cursor
+        res = authorized_client.get("/users/me/posts", params=params)
+        assert res.status_code == 200
+        page = schemas.PostPage(**res.json())
+        seen.extend(post.Post.id for post in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert sorted(seen) == sorted(post.id for post in own_posts)
+
+
+# Test the compact format selected through Accept is sent with its media type
+def test_get_user_posts_compact_accept_header(authorized_client, test_user, test_posts):
+    res = authorized_client.get(f"/users/{test_user['id']}/posts",
+                                headers={"Accept": "application/vnd.posts.compact+json"})
+    page = schemas.PostListCompact(**res.json())
+
+    assert {post.owner_id for post in page.posts} == {test_user['id']}
+    assert res.headers["content-type"] == "application/vnd.posts.compact+json"
+    assert res.headers["vary"] == "Accept"
+
+
+# Test listing posts of a non-existent user
+def test_get_user_posts_not_exist(authorized_client, test_posts):
+    res = authorized_client.get("/users/88888/posts")
+    assert res.status_code == 404
+
+
+# Test a malformed cursor is rejected
+def test_get_user_posts_bad_cursor(authorized_client, test_user, test_posts):
+    res = authorized_client.get(f"/users/{test_user['id']}/posts", params={"cursor": "not-a-cursor"})
+    assert res.status_code == 400
+
+
+# Test the stats counters follow posts and votes made through the API
+def test_get_user_stats(authorized_client, test_user):
+    res = authorized_client.get(f"/users/{test_user['id']}/stats")
+    assert res.status_code == 200
+    assert res.json() == {"user_id": test_user['id'], "posts_written": 0, "votes_received": 0}
+
+    post = authorized_client.post("/posts/", json={"title": "stats", "content": "counted"}).json()
+    authorized_client.post("/Upvote/", json={"post_id": post['id'], "dir": 1})
+    stats = schemas.UserStats(**authorized_client.get(f"/users/{test_user['id']}/stats").json())
+    assert (stats.posts_written, stats.votes_received) == (1, 1)
+
+    authorized_client.delete(f"/posts/{post['id']}")
+    stats = schemas.UserStats(**authorized_client.get(f"/users/{test_user['id']}/stats").json())
+    assert (stats.posts_written, stats.votes_received) == (0, 0)
+
+
+# Test users who wrote posts before their stats row existed are counted from their posts
+def test_get_user_stats_without_row(authorized_client, session, test_user, test_posts):
+    session.query(models.UserStats).delete()
+    session.commit()
+    written = sum(post.owner_id == test_user['id'] for post in test_posts)
+    stats = authorized_client.get(f"/users/{test_user['id']}/stats").json()
+    assert (stats['posts_written'], stats['votes_received']) == (written, 0)
+
+    authorized_client.post("/posts/", json={"title": "seeded", "content": "from count"})
+    stats = authorized_client.get(f"/users/{test_user['id']}/stats").json()
+    assert (stats['posts_written'], stats['votes_received']) == (written + 1, 0)
+
+
+# Test stats of a non-existent user
+def test_get_user_stats_not_exist(authorized_client):
+    res = authorized_client.get("/users/88888/stats")
+    assert res.status_code == 404